@@ -164,6 +164,177 @@ make_test('1-small',
               'avg_fullness': 100,
               'unscheduled': 0
           })
+make_test('1-small-ffd',
+          {
+            'depot_location': 'Toronto',
+            'parcel_file': 'data/parcel-data-small.txt',
+            'truck_file': 'data/truck-data-small.txt',
+            'map_file': 'data/map-data-2.txt',
+            'algorithm': 'ffd',
+            'parcel_priority': 'volume',
+            'parcel_order': 'non-decreasing',
+            'truck_order': 'non-decreasing',
+            'verbose': 'false'},
+          {
+              'fleet': 3,
+              'unused_trucks': 0,
+              'unused_space': 0,
+              'avg_distance': 96.3,
+              'avg_fullness': 100,
+              'unscheduled': 0
+          })
+make_test('1-small-bfd',
+          {
+            'depot_location': 'Toronto',
+            'parcel_file': 'data/parcel-data-small.txt',
+            'truck_file': 'data/truck-data-small.txt',
+            'map_file': 'data/map-data-2.txt',
+            'algorithm': 'bfd',
+            'parcel_priority': 'volume',
+            'parcel_order': 'non-decreasing',
+            'truck_order': 'non-decreasing',
+            'verbose': 'false'},
+          {
+              'fleet': 3,
+              'unused_trucks': 0,
+              'unused_space': 0,
+              'avg_distance': 96.3,
+              'avg_fullness': 100,
+              'unscheduled': 0
+          })
+make_test('1-small-improving',
+          {
+            'depot_location': 'Toronto',
+            'parcel_file': 'data/parcel-data-small.txt',
+            'truck_file': 'data/truck-data-small.txt',
+            'map_file': 'data/map-data-2.txt',
+            'algorithm': 'improving',
+            'base': 'greedy',
+            'improve_time_limit': '0.5',
+            'parcel_priority': 'volume',
+            'parcel_order': 'non-decreasing',
+            'truck_order': 'non-decreasing',
+            'verbose': 'false'},
+          {
+              'fleet': 3,
+              'unused_trucks': 0,
+              'unused_space': 0,
+              'avg_distance': 96.3,
+              'avg_fullness': 100,
+              'unscheduled': 0
+          })
+make_test('1-small-table',
+          {
+            'depot_location': 'Toronto',
+            'parcel_file': 'data/parcel-data-small.txt',
+            'truck_file': 'data/truck-data-small.txt',
+            'map_file': 'data/map-data-2.txt',
+            'parcel_storage': 'table',
+            'algorithm': 'greedy',
+            'parcel_priority': 'volume',
+            'parcel_order': 'non-decreasing',
+            'truck_order': 'non-decreasing',
+            'verbose': 'false'},
+          {
+              'fleet': 3,
+              'unused_trucks': 0,
+              'unused_space': 0,
+              'avg_distance': 96.3,
+              'avg_fullness': 100,
+              'unscheduled': 0
+          })
+make_test('1-vector-greedy',
+          {
+            'depot_location': 'Toronto',
+            'parcel_file': 'data/parcel-1.txt',
+            'truck_file': 'data/truck-1.txt',
+            'map_file': 'data/map-data-2.txt',
+            'algorithm': 'vector-greedy',
+            'parcel_priority': 'volume',
+            'parcel_order': 'non-decreasing',
+            'truck_order': 'non-decreasing',
+            'verbose': 'false'},
+          {
+              'fleet': 4,
+              'unused_trucks': 0,
+              'unused_space': 48,
+              'avg_distance': 388.5,
+              'avg_fullness': 88.9,
+              'unscheduled': 2
+          })
+make_test('1-optimize-routes',
+          {
+            'depot_location': 'Toronto',
+            'parcel_file': 'data/parcel-1.txt',
+            'truck_file': 'data/truck-1.txt',
+            'map_file': 'data/map-data-2.txt',
+            'algorithm': 'greedy',
+            'parcel_priority': 'volume',
+            'parcel_order': 'non-decreasing',
+            'truck_order': 'non-decreasing',
+            'optimize_routes': 'true',
+            'verbose': 'false'},
+          {
+              'fleet': 4,
+              'unused_trucks': 0,
+              'unused_space': 48,
+              'avg_distance': 284.75,
+              'avg_fullness': 88.9,
+              'unscheduled': 2
+          })
+
+
+class TestOptimizeRoutes(unittest.TestCase):
+    """Compare each truck's route with and without optimize_routes."""
+
+    def test_routes_no_longer_and_start_at_depot(self):
+        config = {
+            'depot_location': 'Toronto',
+            'parcel_file': 'data/parcel-1.txt',
+            'truck_file': 'data/truck-1.txt',
+            'map_file': 'data/map-data-2.txt',
+            'algorithm': 'greedy',
+            'parcel_priority': 'volume',
+            'parcel_order': 'non-decreasing',
+            'truck_order': 'non-decreasing',
+            'verbose': 'false'}
+        plain = SchedulingExperiment(config)
+        plain.run()
+        optimized = SchedulingExperiment(dict(config, optimize_routes='true'))
+        optimized.run()
+        for before, after in zip(plain._truck_list, optimized._truck_list):
+            self.assertEqual(after.get_route()[0], 'Toronto')
+            self.assertEqual(sorted(after.get_route()),
+                             sorted(before.get_route()))
+            self.assertLessEqual(after.get_distance(), before.get_distance())
+
+
+
+class TestMissingDistance(unittest.TestCase):
+    """Run on a map that lacks direct routes between some cities."""
+
+    config = {
+        'depot_location': 'Toronto',
+        'parcel_file': 'data/parcel-1.txt',
+        'truck_file': 'data/truck-1.txt',
+        'map_file': 'data/map-data-sparse.txt',
+        'algorithm': 'greedy',
+        'parcel_priority': 'volume',
+        'parcel_order': 'non-decreasing',
+        'truck_order': 'non-decreasing',
+        'verbose': 'false'}
+
+    def test_missing_leg_names_the_route(self):
+        experiment = SchedulingExperiment(dict(self.config,
+                                               shortest_paths='false'))
+        with self.assertRaisesRegex(ValueError, 'route of truck .*Toronto'):
+            experiment.run()
+
+    def test_shortest_paths_fill_the_gaps(self):
+        results = SchedulingExperiment(dict(self.config,
+                                            shortest_paths='true')).run()
+        self.assertGreater(results['avg_distance'], 0)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -16,8 +16,24 @@ Container
     will not be accessed by the client. Container will not be instantialised.
 PriorityQueue
     Container that sorts objects as it gets added. Container can be accessed by
-    client or scheduler.py.
+    client or scheduler.py. Backed by a binary heap.
+IndexedPriorityQueue
+    PriorityQueue whose items can also be looked up by id, so that a queued
+    item can be discarded or given a new priority in O(log n).
+ConcurrentPriorityQueue
+    PriorityQueue that can be shared between threads. remove blocks until an
+    item arrives.
+AsyncPriorityQueue
+    asyncio queue that removes items in the same order as PriorityQueue.
+BucketQueue
+    Container for items whose priority is a small integer code. Adding and
+    removing are O(1). Can be accessed by client or scheduler.py.
 """
+from heapq import heappush, heappop, heapify
+from collections import deque
+from threading import Condition
+from queue import Empty
+import asyncio
 
 
 class Container:
@@ -36,6 +52,20 @@ class Container:
         """
         raise NotImplementedError
 
+    def add_all(self, items):
+        """Add every item of <items> to this Container, in order.
+
+        Child classes may override this with a faster bulk operation.
+
+        === Parameter and Return Types ===
+
+        @type self: Container
+        @type items: Iterable[Object]
+        @rtype: None
+        """
+        for item in items:
+            self.add(item)
+
     def remove(self):
         """Remove and return a single item from this Container.
 
@@ -65,42 +95,103 @@ class PriorityQueue(Container):
     (FIFO) order, meaning the item which was inserted *earlier* is the first one
     to be removed.
 
-    Priority is defined by the <less_than> function that is provided at time
-    of construction.  If x < y, then x has a *HIGHER* priority than y.
-    (Intuitively, something with "priority 1" is more important than something
-    with "priority 10".)
+    Priority is defined either by the <less_than> function or by the <key>
+    function that is provided at time of construction.  If x < y, then x has a
+    *HIGHER* priority than y.  (Intuitively, something with "priority 1" is
+    more important than something with "priority 10".)  With <key>, x has a
+    higher priority than y iff key(x) < key(y).
+
+    The queue is a binary heap, so add and remove are O(log n).
 
     All objects in the container must be of the same type.
 
     === Private Attributes ===
 
     @type _queue: List
-        The end of the list represents the *front* of the queue, that is,
-        the next item to be removed.
-    @type _less_than: Callable[[Object, Object], bool]
+        A binary heap of entries. _queue[0] is the entry of the next item to
+        be removed. Each entry is a tuple (key, order, item) when a key
+        function is used, and a _LessThanEntry otherwise.
+    @type _less_than: Callable[[Object, Object], bool] | None
         If _less_than(x, y) is true, then x has higher priority than y
         and should be removed from the queue before y.
+    @type _key: Callable[[Object], Object] | None
+        If _key(x) < _key(y), then x has higher priority than y.
+    @type _order: int
+        The number of items ever added. Used as the insertion order of the
+        next item so that ties are resolved in FIFO order.
 
     === Representation Invariants ===
 
+    - exactly one of _less_than and _key is None
     - all elements of _queue are of the same type
     - the elements of _queue are appropriate arguments for function less_than
-    - the elements of _queue are in order according to function less_than.
+    - _queue satisfies the heap property according to the entry ordering.
     """
 
-    def __init__(self, less_than):
+    def __init__(self, less_than=None, key=None):
         """Initialize this to an empty PriorityQueue.
 
         === Parameter and Return Types ===
 
         @type self: PriorityQueue
-        @type less_than: Callable[[Object, Object], bool]
+        @type less_than: Callable[[Object, Object], bool] | None
             Determines the relative priority of two elements of the queue.
             If less_than(x, y) is true, then x has higher priority than y.
+        @type key: Callable[[Object], Object] | None
+            Used instead of <less_than>. If key(x) < key(y), then x has
+            higher priority than y.
         @rtype: None
+
+        === Precondition ===
+
+        Exactly one of <less_than> and <key> is given.
         """
+        if (less_than is None) == (key is None):
+            raise ValueError('exactly one of less_than and key is required')
         self._queue = []
         self._less_than = less_than
+        self._key = key
+        self._order = 0
+
+    @classmethod
+    def from_iterable(cls, items, less_than=None, key=None):
+        """Return a new PriorityQueue holding every item of <items>.
+
+        Items are added in iteration order, so ties are removed in the order
+        they appear in <items>. Building the queue is O(n).
+
+        === Parameter and Return Types ===
+
+        @type items: Iterable[Object]
+        @type less_than: Callable[[Object, Object], bool] | None
+        @type key: Callable[[Object], Object] | None
+        @rtype: PriorityQueue
+
+        === Examples ===
+
+        >>> pq = PriorityQueue.from_iterable(['fred', 'arju', 'monalisa',
+        ...                                   'hat'], key=len)
+        >>> [pq.remove() for _ in range(4)]
+        ['hat', 'fred', 'arju', 'monalisa']
+        """
+        queue = cls(less_than, key)
+        queue.add_all(items)
+        return queue
+
+    def _make_entry(self, item):
+        """Return the heap entry for <item> and advance the insertion order.
+
+        === Parameter and Return Types ===
+
+        @type self: PriorityQueue
+        @type item: Object
+        @rtype: tuple | _LessThanEntry
+        """
+        order = self._order
+        self._order += 1
+        if self._key is not None:
+            return self._key(item), order, item
+        return _LessThanEntry(item, order, self._less_than)
 
     def add(self, item):
         """Add <item> to this PriorityQueue.
@@ -108,7 +199,7 @@ class PriorityQueue(Container):
         === Preconditions ===
 
         Unless there are 0 items in <self._queue>,
-            type(item) == type(self._queue[0])
+            type(item) == type of the items already in the queue
 
         === Examples ===
 
@@ -123,30 +214,40 @@ class PriorityQueue(Container):
         >>> pq.add('arju')
         >>> pq.add('monalisa')
         >>> pq.add('hat')
-        >>> pq._queue
-        ['monalisa', 'arju', 'fred', 'hat']
+        >>> len(pq)
+        4
         >>> pq.remove()
         'hat'
-        >>> pq._queue
-        ['monalisa', 'arju', 'fred']
+        >>> len(pq)
+        3
         """
+        heappush(self._queue, self._make_entry(item))
 
-        # Wants to place item at the end of _queue list first
-        queue_placement = len(self._queue)
-        higher_priority = False
-        if queue_placement == 0:
-            # If there are no items in the list, just add the item into the list
-            self._queue.append(item)
-        else:
-            # While the program there are still items to compare
-            while queue_placement >= 1 and higher_priority is False:
-                # If item has a higher priority, stop searching. Else, continue
-                # searching a lower priority object
-                higher_priority = self.\
-                    _less_than(item, self._queue[queue_placement - 1])
-                if higher_priority is False:
-                    queue_placement -= 1
-            self._queue.insert(queue_placement, item)
+    def add_all(self, items):
+        """Add every item of <items> to this PriorityQueue, in order.
+
+        The new entries are appended and the heap is rebuilt once, which is
+        O(n) instead of O(n log n) for repeated calls to add.
+
+        === Parameter and Return Types ===
+
+        @type self: PriorityQueue
+        @type items: Iterable[Object]
+        @rtype: None
+
+        === Examples ===
+
+        >>> def shorter(a, b):
+        ...    return len(a) < len(b)
+        ...
+        >>> pq = PriorityQueue(shorter)
+        >>> pq.add('monalisa')
+        >>> pq.add_all(['fred', 'hat', 'arju'])
+        >>> [pq.remove() for _ in range(4)]
+        ['hat', 'fred', 'arju', 'monalisa']
+        """
+        self._queue.extend(self._make_entry(item) for item in items)
+        heapify(self._queue)
 
     def remove(self):
         """Remove and return the next item from this PriorityQueue.
@@ -176,8 +277,15 @@ class PriorityQueue(Container):
         'arju'
         >>> pq.remove()
         'monalisa'
+
+        >>> # The same order, using a key function instead.
+        >>> pq = PriorityQueue(key=len)
+        >>> for word in ['fred', 'arju', 'monalisa', 'hat']:
+        ...     pq.add(word)
+        >>> [pq.remove() for _ in range(4)]
+        ['hat', 'fred', 'arju', 'monalisa']
         """
-        return self._queue.pop()
+        return heappop(self._queue)[-1]
 
     def is_empty(self):
         """Return True iff this PriorityQueue is empty.
@@ -197,6 +305,753 @@ class PriorityQueue(Container):
         """
         return not self._queue
 
+    def __len__(self):
+        """Return the number of items in this PriorityQueue.
+
+        === Parameter and Return Types ===
+
+        @type self: PriorityQueue
+        @rtype: int
+        """
+        return len(self._queue)
+
+    def __iter__(self):
+        """Return an iterator over the items of this PriorityQueue, in the
+        order they would be removed.
+
+        The queue is not changed. Sorting the heap makes this O(n log n).
+
+        === Parameter and Return Types ===
+
+        @type self: PriorityQueue
+        @rtype: Iterator[Object]
+
+        === Examples ===
+
+        >>> pq = PriorityQueue(key=len)
+        >>> pq.add_all(['fred', 'arju', 'monalisa', 'hat'])
+        >>> list(pq)
+        ['hat', 'fred', 'arju', 'monalisa']
+        >>> len(pq)
+        4
+        """
+        return (entry[-1] for entry in sorted(self._queue))
+
+
+class IndexedPriorityQueue(PriorityQueue):
+    """A PriorityQueue whose items can be updated or discarded by id.
+
+    Every queued item has a unique id, given by the <item_id> function. A
+    position map from id to heap index lets update, discard and peek run in
+    O(log n) (peek in O(1)) without rebuilding the queue.
+
+    An item whose priority is updated is treated as re-queued: among items of
+    equal priority it is removed after every item that was already queued.
+
+    === Private Attributes ===
+
+    @type _item_id: Callable[[Object], Hashable]
+        Returns the id of an item.
+    @type _ids: list[Hashable]
+        _ids[i] is the id of the item of entry _queue[i].
+    @type _positions: dict[Hashable, int]
+        Maps the id of every queued item to the index of its entry in _queue.
+
+    === Representation Invariants ===
+
+    - _positions[_ids[i]] == i for every index i of _queue
+    - no two queued items share an id
+    """
+
+    def __init__(self, less_than=None, key=None, item_id=None):
+        """Initialize this to an empty IndexedPriorityQueue.
+
+        === Parameter and Return Types ===
+
+        @type self: IndexedPriorityQueue
+        @type less_than: Callable[[Object, Object], bool] | None
+        @type key: Callable[[Object], Object] | None
+        @type item_id: Callable[[Object], Hashable] | None
+            Returns the id of an item. By default, item.get_id() is used.
+        @rtype: None
+        """
+        PriorityQueue.__init__(self, less_than, key)
+        self._item_id = item_id if item_id is not None else _get_id
+        self._ids = []
+        self._positions = {}
+
+    def add(self, item):
+        """Add <item> to this IndexedPriorityQueue.
+
+        === Precondition ===
+
+        No queued item has the same id as <item>.
+
+        === Examples ===
+
+        >>> pq = IndexedPriorityQueue(key=len, item_id=str.lower)
+        >>> pq.add('fred')
+        >>> pq.add('hat')
+        >>> pq.add('HAT')
+        Traceback (most recent call last):
+        ...
+        ValueError: an item with id 'hat' is already queued
+        """
+        item_id = self._item_id(item)
+        if item_id in self._positions:
+            raise ValueError('an item with id {!r} is already queued'
+                             .format(item_id))
+        self._queue.append(self._make_entry(item))
+        self._ids.append(item_id)
+        self._sift_up(len(self._queue) - 1)
+
+    def add_all(self, items):
+        """Add every item of <items> to this IndexedPriorityQueue, in order.
+
+        A few items are sifted up one at a time. When there are about as many
+        new items as queued ones, the heap is rebuilt once instead.
+
+        Raise ValueError, and add nothing, if two of <items> or an item of
+        <items> and a queued item have the same id.
+
+        === Examples ===
+
+        >>> pq = IndexedPriorityQueue(key=len, item_id=str.lower)
+        >>> pq.add_all(['fred', 'arju', 'monalisa', 'hat'])
+        >>> pq.add_all(['a'])
+        >>> [pq.remove() for _ in range(5)]
+        ['a', 'hat', 'fred', 'arju', 'monalisa']
+        >>> pq.add_all(['fred', 'hat', 'HAT'])
+        Traceback (most recent call last):
+        ...
+        ValueError: an item with id 'hat' is already queued
+        >>> len(pq)
+        0
+        """
+        items = list(items)
+        item_ids = [self._item_id(item) for item in items]
+        new_ids = set()
+        for item_id in item_ids:
+            if item_id in self._positions or item_id in new_ids:
+                raise ValueError('an item with id {!r} is already queued'
+                                 .format(item_id))
+            new_ids.add(item_id)
+
+        queue, ids, positions = self._queue, self._ids, self._positions
+        start = len(queue)
+        for item, item_id in zip(items, item_ids):
+            positions[item_id] = len(queue)
+            queue.append(self._make_entry(item))
+            ids.append(item_id)
+        if len(items) * start.bit_length() < len(queue):
+            for position in range(start, len(queue)):
+                self._sift_up(position)
+        else:
+            for position in reversed(range(len(queue) // 2)):
+                self._sift_down(position)
+
+    def remove(self):
+        """Remove and return the next item from this IndexedPriorityQueue.
+
+        === Preconditions ===
+
+        len(self._queue) > 0
+        """
+        item = self._queue[0][-1]
+        self._delete(0)
+        return item
+
+    def peek(self):
+        """Return the next item of this IndexedPriorityQueue without removing
+        it.
+
+        === Preconditions ===
+
+        len(self._queue) > 0
+
+        === Examples ===
+
+        >>> pq = IndexedPriorityQueue(key=len, item_id=str.lower)
+        >>> pq.add_all(['fred', 'hat'])
+        >>> pq.peek()
+        'hat'
+        >>> len(pq)
+        2
+        """
+        return self._queue[0][-1]
+
+    def discard(self, item_id):
+        """Remove and return the item with id <item_id>.
+
+        Return None if no such item is queued.
+
+        === Parameter and Return Types ===
+
+        @type self: IndexedPriorityQueue
+        @type item_id: Hashable
+        @rtype: Object | None
+
+        === Examples ===
+
+        >>> pq = IndexedPriorityQueue(key=len, item_id=str.lower)
+        >>> pq.add_all(['fred', 'arju', 'monalisa', 'hat'])
+        >>> pq.discard('arju')
+        'arju'
+        >>> pq.discard('arju')
+        >>> [pq.remove() for _ in range(3)]
+        ['hat', 'fred', 'monalisa']
+        """
+        if item_id not in self._positions:
+            return None
+        position = self._positions[item_id]
+        item = self._queue[position][-1]
+        self._delete(position)
+        return item
+
+    def update(self, item_id, item=None):
+        """Re-queue the item with id <item_id> with its current priority.
+
+        If <item> is given, it replaces the queued item. Use this after the
+        priority of an item changes.
+
+        === Parameter and Return Types ===
+
+        @type self: IndexedPriorityQueue
+        @type item_id: Hashable
+        @type item: Object | None
+        @rtype: None
+
+        === Precondition ===
+
+        An item with id <item_id> is queued, and <item> has id <item_id>.
+
+        === Examples ===
+
+        >>> pq = IndexedPriorityQueue(key=len, item_id=str.lower)
+        >>> pq.add_all(['fred', 'arju', 'monalisa', 'hat'])
+        >>> pq.update('monalisa', 'MONA')
+        >>> pq.update('fred')
+        >>> [pq.remove() for _ in range(4)]
+        ['hat', 'arju', 'MONA', 'fred']
+        """
+        position = self._positions[item_id]
+        if item is None:
+            item = self._queue[position][-1]
+        self._queue[position] = self._make_entry(item)
+        self._sift_up(position)
+        self._sift_down(self._positions[item_id])
+
+    def __contains__(self, item_id):
+        """Return True iff an item with id <item_id> is queued.
+
+        === Parameter and Return Types ===
+
+        @type self: IndexedPriorityQueue
+        @type item_id: Hashable
+        @rtype: bool
+        """
+        return item_id in self._positions
+
+    def _delete(self, position):
+        """Delete the entry at index <position> of the heap.
+
+        === Parameter and Return Types ===
+
+        @type self: IndexedPriorityQueue
+        @type position: int
+        @rtype: None
+        """
+        del self._positions[self._ids[position]]
+        last_entry = self._queue.pop()
+        last_id = self._ids.pop()
+        if position < len(self._queue):
+            self._queue[position] = last_entry
+            self._ids[position] = last_id
+            self._sift_up(position)
+            self._sift_down(self._positions[last_id])
+
+    def _sift_up(self, position):
+        """Move the entry at <position> towards the root until its parent
+        comes before it.
+
+        === Parameter and Return Types ===
+
+        @type self: IndexedPriorityQueue
+        @type position: int
+        @rtype: None
+        """
+        queue, ids, positions = self._queue, self._ids, self._positions
+        entry, entry_id = queue[position], ids[position]
+        while position > 0:
+            parent = (position - 1) >> 1
+            if not entry < queue[parent]:
+                break
+            queue[position], ids[position] = queue[parent], ids[parent]
+            positions[ids[position]] = position
+            position = parent
+        queue[position], ids[position] = entry, entry_id
+        positions[entry_id] = position
+
+    def _sift_down(self, position):
+        """Move the entry at <position> towards the leaves until it comes
+        before both of its children.
+
+        === Parameter and Return Types ===
+
+        @type self: IndexedPriorityQueue
+        @type position: int
+        @rtype: None
+        """
+        queue, ids, positions = self._queue, self._ids, self._positions
+        size = len(queue)
+        entry, entry_id = queue[position], ids[position]
+        child = 2 * position + 1
+        while child < size:
+            if child + 1 < size and queue[child + 1] < queue[child]:
+                child += 1
+            if not queue[child] < entry:
+                break
+            queue[position], ids[position] = queue[child], ids[child]
+            positions[ids[position]] = position
+            position = child
+            child = 2 * position + 1
+        queue[position], ids[position] = entry, entry_id
+        positions[entry_id] = position
+
+
+class ConcurrentPriorityQueue(PriorityQueue):
+    """A PriorityQueue that can be shared between threads.
+
+    Every operation holds a lock, so several intake threads can add items while
+    a scheduler thread removes them. remove blocks until an item is available.
+    Items are removed in the same order as PriorityQueue.
+
+    === Private Attributes ===
+
+    @type _not_empty: Condition
+        Guards the queue. Notified whenever items are added.
+    """
+
+    def __init__(self, less_than=None, key=None):
+        """Initialize this to an empty ConcurrentPriorityQueue.
+
+        === Parameter and Return Types ===
+
+        @type self: ConcurrentPriorityQueue
+        @type less_than: Callable[[Object, Object], bool] | None
+        @type key: Callable[[Object], Object] | None
+        @rtype: None
+        """
+        PriorityQueue.__init__(self, less_than, key)
+        self._not_empty = Condition()
+
+    def add(self, item):
+        """Add <item> to this ConcurrentPriorityQueue and wake one thread that
+        is waiting in remove.
+
+        === Parameter and Return Types ===
+
+        @type self: ConcurrentPriorityQueue
+        @type item: Object
+        @rtype: None
+        """
+        with self._not_empty:
+            PriorityQueue.add(self, item)
+            self._not_empty.notify()
+
+    def add_all(self, items):
+        """Add every item of <items> to this ConcurrentPriorityQueue, in order.
+
+        === Parameter and Return Types ===
+
+        @type self: ConcurrentPriorityQueue
+        @type items: Iterable[Object]
+        @rtype: None
+        """
+        items = list(items)
+        with self._not_empty:
+            PriorityQueue.add_all(self, items)
+            self._not_empty.notify(len(items))
+
+    def remove(self, timeout=None):
+        """Remove and return the next item from this ConcurrentPriorityQueue.
+
+        Wait until an item is available. If <timeout> is not None, wait at
+        most <timeout> seconds and raise queue.Empty if no item arrived.
+
+        === Parameter and Return Types ===
+
+        @type self: ConcurrentPriorityQueue
+        @type timeout: float | None
+        @rtype: Object
+
+        === Examples ===
+
+        >>> pq = ConcurrentPriorityQueue(key=len)
+        >>> pq.add_all(['fred', 'hat'])
+        >>> pq.remove()
+        'hat'
+        >>> pq.remove(timeout=0)
+        'fred'
+        >>> pq.remove(timeout=0)
+        Traceback (most recent call last):
+        ...
+        _queue.Empty
+        """
+        with self._not_empty:
+            if not self._not_empty.wait_for(self._has_items, timeout):
+                raise Empty
+            return PriorityQueue.remove(self)
+
+    def is_empty(self):
+        """Return True iff this ConcurrentPriorityQueue is empty.
+
+        === Parameter and Return Types ===
+
+        @type self: ConcurrentPriorityQueue
+        @rtype: bool
+        """
+        with self._not_empty:
+            return PriorityQueue.is_empty(self)
+
+    def __len__(self):
+        """Return the number of items in this ConcurrentPriorityQueue.
+
+        === Parameter and Return Types ===
+
+        @type self: ConcurrentPriorityQueue
+        @rtype: int
+        """
+        with self._not_empty:
+            return PriorityQueue.__len__(self)
+
+    def __iter__(self):
+        """Return an iterator over the items of this ConcurrentPriorityQueue,
+        in the order they would be removed.
+
+        The items are copied while the lock is held, so items added or
+        removed afterwards do not affect the iterator.
+
+        === Parameter and Return Types ===
+
+        @type self: ConcurrentPriorityQueue
+        @rtype: Iterator[Object]
+
+        === Examples ===
+
+        >>> pq = ConcurrentPriorityQueue(key=len)
+        >>> pq.add_all(['fred', 'hat'])
+        >>> items = iter(pq)
+        >>> pq.remove()
+        'hat'
+        >>> list(items), len(pq)
+        (['hat', 'fred'], 1)
+        """
+        with self._not_empty:
+            return iter(list(PriorityQueue.__iter__(self)))
+
+    def _has_items(self):
+        """Return True iff the queue holds an item. The caller holds the lock.
+
+        === Parameter and Return Types ===
+
+        @type self: ConcurrentPriorityQueue
+        @rtype: bool
+        """
+        return len(self._queue) > 0
+
+
+class AsyncPriorityQueue(asyncio.Queue):
+    """An asyncio queue that removes items in the same order as PriorityQueue.
+
+    Use <await put(item)> and <await get()> as with any asyncio.Queue. get
+    waits until an item is available, and put waits while the queue holds
+    <maxsize> items (if <maxsize> is positive). Ties are removed in FIFO order.
+
+    === Private Attributes ===
+
+    @type _queue: PriorityQueue
+        The queued items. asyncio.Queue reads this attribute directly.
+    @type _less_than: Callable[[Object, Object], bool] | None
+    @type _key: Callable[[Object], Object] | None
+        The priority functions of _queue.
+
+    === Examples ===
+
+    >>> async def demo():
+    ...     pq = AsyncPriorityQueue(key=len)
+    ...     for word in ['fred', 'arju', 'monalisa', 'hat']:
+    ...         await pq.put(word)
+    ...     return [await pq.get() for _ in range(4)]
+    >>> asyncio.run(demo())
+    ['hat', 'fred', 'arju', 'monalisa']
+    >>> pq = AsyncPriorityQueue(key=len)
+    >>> pq.put_nowait('fred')
+    >>> pq.put_nowait('hat')
+    >>> str(pq)
+    "<AsyncPriorityQueue maxsize=0 _queue=['hat', 'fred'] tasks=2>"
+    >>> repr(pq).endswith("_queue=['hat', 'fred'] tasks=2>")
+    True
+    """
+
+    def __init__(self, less_than=None, key=None, maxsize=0):
+        """Initialize this to an empty AsyncPriorityQueue.
+
+        === Parameter and Return Types ===
+
+        @type self: AsyncPriorityQueue
+        @type less_than: Callable[[Object, Object], bool] | None
+        @type key: Callable[[Object], Object] | None
+        @type maxsize: int
+            The most items the queue may hold. 0 means unbounded.
+        @rtype: None
+        """
+        self._less_than = less_than
+        self._key = key
+        asyncio.Queue.__init__(self, maxsize)
+
+    # The hooks below are the extension points asyncio.Queue provides for its
+    # own PriorityQueue and LifoQueue.
+    def _init(self, maxsize):
+        """Create the empty PriorityQueue that holds the items.
+
+        Called by asyncio.Queue.__init__.
+
+        === Parameter and Return Types ===
+
+        @type self: AsyncPriorityQueue
+        @type maxsize: int
+            Unused; asyncio.Queue enforces it.
+        @rtype: None
+        """
+        self._queue = PriorityQueue(self._less_than, self._key)
+
+    def _put(self, item):
+        """Add <item> to the queued items.
+
+        Called by put and put_nowait once there is room.
+
+        === Parameter and Return Types ===
+
+        @type self: AsyncPriorityQueue
+        @type item: Object
+        @rtype: None
+        """
+        self._queue.add(item)
+
+    def _get(self):
+        """Remove and return the item with the highest priority.
+
+        Called by get and get_nowait once an item is available.
+
+        === Parameter and Return Types ===
+
+        @type self: AsyncPriorityQueue
+        @rtype: Object
+        """
+        return self._queue.remove()
+
+    def _qsize(self):
+        """Return the number of queued items.
+
+        === Parameter and Return Types ===
+
+        @type self: AsyncPriorityQueue
+        @rtype: int
+        """
+        return len(self._queue)
+
+
+def _get_id(item):
+    """Return the id of <item>. The default id function of
+    IndexedPriorityQueue.
+
+    @type item: Object
+    @rtype: Hashable
+    """
+    return item.get_id()
+
+
+class _LessThanEntry:
+    """A heap entry of a PriorityQueue that orders items with a <less_than>
+    function, falling back to insertion order on ties.
+
+    Indexing with -1 returns the item so that entries can be read in the same
+    way as the (key, order, item) tuples used with key functions.
+
+    === Private Attributes ===
+
+    @type _item: Object
+        The queued item.
+    @type _order: int
+        The insertion order of the item.
+    @type _less_than: Callable[[Object, Object], bool]
+        The priority function of the queue that owns this entry.
+    """
+    __slots__ = ('_item', '_order', '_less_than')
+
+    def __init__(self, item, order, less_than):
+        """Initialise an entry.
+
+        === Parameter and Return Types ===
+
+        @type self: _LessThanEntry
+        @type item: Object
+        @type order: int
+        @type less_than: Callable[[Object, Object], bool]
+        @rtype: None
+        """
+        self._item = item
+        self._order = order
+        self._less_than = less_than
+
+    def __lt__(self, other):
+        """Return True iff this entry should be removed before <other>.
+
+        === Parameter and Return Types ===
+
+        @type self: _LessThanEntry
+        @type other: _LessThanEntry
+        @rtype: bool
+        """
+        if self._less_than(self._item, other._item):
+            return True
+        if self._less_than(other._item, self._item):
+            return False
+        return self._order < other._order
+
+    def __getitem__(self, index):
+        """Return the item of this entry. Only index -1 is supported.
+
+        === Parameter and Return Types ===
+
+        @type self: _LessThanEntry
+        @type index: int
+        @rtype: Object
+        """
+        if index != -1:
+            raise IndexError(index)
+        return self._item
+
+
+class BucketQueue(Container):
+    """A queue of items that operates in FIFO-priority order, where priority is
+    a small non-negative integer code.
+
+    Items are removed in increasing order of <priority_code>; code 0 is the
+    highest priority. Ties are resolved in FIFO order. Each code has its own
+    bucket, so add and remove are O(1) (amortised over a sequence of removes).
+
+    === Private Attributes ===
+
+    @type _buckets: list[deque | None]
+        _buckets[code] holds the queued items with that code in insertion
+        order. A bucket is None until an item with its code is added.
+    @type _priority_code: Callable[[Object], int]
+        Maps an item to the index of its bucket.
+    @type _lowest: int
+        No bucket before _buckets[_lowest] holds an item.
+    @type _size: int
+        The number of items in the queue.
+
+    === Representation Invariants ===
+
+    - 0 <= _priority_code(item) < len(_buckets) for every queued item
+    - _size is the total number of items in _buckets
+    """
+
+    def __init__(self, priority_code, num_buckets):
+        """Initialize this to an empty BucketQueue.
+
+        === Parameter and Return Types ===
+
+        @type self: BucketQueue
+        @type priority_code: Callable[[Object], int]
+            Maps an item to its priority code. A lower code is a higher
+            priority.
+        @type num_buckets: int
+            One more than the largest priority code.
+        @rtype: None
+        """
+        self._buckets = [None] * num_buckets
+        self._priority_code = priority_code
+        self._lowest = num_buckets
+        self._size = 0
+
+    def add(self, item):
+        """Add <item> to this BucketQueue.
+
+        === Precondition ===
+
+        0 <= self._priority_code(item) < len(self._buckets)
+
+        === Examples ===
+
+        >>> bq = BucketQueue(len, 10)
+        >>> bq.add('fred')
+        >>> bq.add('hat')
+        >>> len(bq)
+        2
+        """
+        code = self._priority_code(item)
+        bucket = self._buckets[code]
+        if bucket is None:
+            bucket = self._buckets[code] = deque()
+        bucket.append(item)
+        if code < self._lowest:
+            self._lowest = code
+        self._size += 1
+
+    def remove(self):
+        """Remove and return the next item from this BucketQueue.
+
+        === Preconditions ===
+
+        self._size > 0
+
+        === Examples ===
+
+        >>> bq = BucketQueue(len, 10)
+        >>> bq.add_all(['fred', 'arju', 'monalisa', 'hat'])
+        >>> bq.remove()
+        'hat'
+        >>> bq.remove()
+        'fred'
+        >>> bq.add('a')
+        >>> [bq.remove() for _ in range(3)]
+        ['a', 'arju', 'monalisa']
+        """
+        bucket = self._buckets[self._lowest]
+        while not bucket:
+            self._lowest += 1
+            bucket = self._buckets[self._lowest]
+        self._size -= 1
+        return bucket.popleft()
+
+    def is_empty(self):
+        """Return True iff this BucketQueue is empty.
+
+        === Examples ===
+
+        >>> bq = BucketQueue(len, 10)
+        >>> bq.is_empty()
+        True
+        >>> bq.add('fred')
+        >>> bq.is_empty()
+        False
+        """
+        return self._size == 0
+
+    def __len__(self):
+        """Return the number of items in this BucketQueue.
+
+        === Parameter and Return Types ===
+
+        @type self: BucketQueue
+        @rtype: int
+        """
+        return self._size
+
 
 if __name__ == '__main__':
     import doctest
@@ -14,7 +14,51 @@ DistanceMap
     DistanceMap is used to represent a map with routes. This class will be
     used to create instances. DistanceMap is expected to be accessed by
     experiment.py.
+
+=== Binary Format ===
+
+A DistanceMap can be saved to, and memory-mapped from, a binary file laid out
+as follows. All integers are little-endian.
+
+    header      4s magic b'DMAP', uint32 version, uint32 flags,
+                uint32 number of cities n. Flag bit 0 is set for a symmetric
+                map, bit 1 if there is a route between every two different
+                cities, and bit 2 if every distance is already the length of
+                a shortest path. Version 1 files have no bits 1 and 2.
+    city table  For each city in id order, a uint16 byte length followed by
+                the UTF-8 encoded name.
+    padding     Zero bytes up to the next multiple of 4.
+    matrix      int32 distances, NO_ROUTE for a missing route. n * n values
+                in row-major order, or the n * (n + 1) / 2 values of the lower
+                triangle for a symmetric map.
 """
+from array import array
+from heapq import heappush, heappop
+import mmap
+import struct
+import sys
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+NO_ROUTE = -1
+_INFINITY = float('inf')
+# Stands for a missing route while Floyd-Warshall runs. It is the largest
+# int32, so min never picks it over a real distance.
+_UNREACHABLE = 2 ** 31 - 1
+# The most matrix entries Floyd-Warshall relaxes in one NumPy call, which
+# bounds the size of its int64 temporaries.
+_RELAX_BLOCK = 1 << 20
+
+BINARY_MAGIC = b'DMAP'
+_BINARY_VERSION = 2
+_SYMMETRIC_FLAG = 1
+_COMPLETE_FLAG = 2
+_SHORTEST_FLAG = 4
+_BINARY_HEADER = struct.Struct('<4sIII')
+_NAME_LENGTH = struct.Struct('<H')
 
 
 class DistanceMap:
@@ -24,25 +68,64 @@ class DistanceMap:
     DistanceMap is essentially a map. If you want to find the distance from city
     A to city B, you can put in an inquiry to this class.
 
+    Every city is interned to an integer id the first time it is seen. The
+    distances are stored in a dense row-major matrix indexed by city id, so a
+    lookup is two dict reads and one array index, and the id based methods
+    skip the dict reads entirely.
+
+    A symmetric map, where the distance from A to B is always the distance
+    from B to A, only stores the lower triangle of the matrix, which is about
+    half the memory. add_route on a symmetric map sets both directions. If a
+    pair of cities is later given a second, different distance, the map
+    switches to dense storage and the two directions are kept apart.
+
     === Private Attributes ===
 
-    @type route: dict{str, int}
-        Every possible route will have an entry. The key will be in the format
-        of CityA_to_CityB. The int will be the distance of the route. It is
-        important to note that CityA_to_CityB may be different than
-        CityB_to_CityA.
+    @type _city_ids: dict{str, int}
+        Maps the name of every known city to its id.
+    @type _city_names: [str]
+        _city_names[i] is the name of the city with id i.
+    @type _size: int
+        The number of cities room is allocated for in _distances. Grows by
+        doubling as cities are added.
+    @type _symmetric: bool
+        Whether only the lower triangle of the matrix is stored.
+    @type _distances: array | memoryview
+        A flat int32 matrix, read through _index. A memoryview over a
+        read-only memory map after load_binary, copied into an array on the
+        first change. Holds the distance from
+        city i to city j, or NO_ROUTE if there is no such route. It is
+        important to note that the route from i to j may be different than
+        the route from j to i, unless _symmetric is True.
+    @type _shortest: bool
+        Whether every distance is the length of a shortest path, because
+        compute_shortest_paths has run since the last change to the map.
+    @type _complete: bool | None
+        Whether there is a route between every two different cities, or None
+        if that has not been checked since the last change to the map.
+
+    === Representation Invariants ===
+
+    len(_city_names) == len(_city_ids) <= _size
+    len(_distances) == _size * _size, or _size * (_size + 1) // 2 if
+        _symmetric
     """
 
-    def __init__(self):
+    def __init__(self, cities=(), symmetric=False):
         """Initialise a map
 
-        No information is required when initialising a map. The attribute route
-        starts off as empty.
+        No information is required when initialising a map. The map starts off
+        without routes. If <cities> is given, those cities are interned in
+        order and room is reserved for every route between them.
 
         === Parameter and Return Types ===
 
         @type self: DistanceMap
             Default parameter
+        @type cities: Iterable[str]
+            Cities to intern up front.
+        @type symmetric: bool
+            Whether to store a single distance per pair of cities.
         @rtype: None
             No return is expected.
 
@@ -54,16 +137,220 @@ class DistanceMap:
         >>> distance_map.get_route_distance("Toronto", "Ottawa")
         1001
         >>> distance_map.get_route_distance("Ottawa", "Toronto")
+        >>> DistanceMap(["Toronto", "Ottawa"]).city_id("Ottawa")
+        1
+        >>> distance_map = DistanceMap(symmetric=True)
+        >>> distance_map.add_route("Toronto", "Ottawa", 1001)
+        >>> distance_map.get_route_distance("Ottawa", "Toronto")
+        1001
+        """
+        self._city_ids = {}
+        self._city_names = []
+        self._size = 0
+        self._symmetric = symmetric
+        self._distances = array('i')
+        self._shortest = False
+        self._complete = None
+        cities = list(cities)
+        self._grow(len(cities))
+        for city in cities:
+            self.add_city(city)
+
+    @classmethod
+    def load_binary(cls, file_name):
+        """Return the map saved in the binary file <file_name>
+
+        The distance matrix is memory-mapped rather than read, so opening is
+        near-instant and every process that opens the same file shares its
+        pages. Only the city table is parsed. Whether the map is complete is
+        read from the header, so is_complete does not scan the matrix.
+
+        === Parameter and Return Types ===
+
+        @type file_name: str
+        @rtype: DistanceMap
+
+        === Examples ===
+
+        >>> import os, tempfile
+        >>> distance_map = DistanceMap()
+        >>> distance_map.add_route("Toronto", "Ottawa", 450)
+        >>> file_name = os.path.join(tempfile.mkdtemp(), 'map.dmap')
+        >>> distance_map.save_binary(file_name)
+        >>> loaded = DistanceMap.load_binary(file_name)
+        >>> loaded.get_route_distance("Toronto", "Ottawa")
+        450
+        >>> loaded.get_route_distance("Ottawa", "Toronto")
+        >>> loaded.is_complete()
+        False
+        >>> loaded.add_route("Ottawa", "Toronto", 451)
+        >>> loaded.get_route_distance("Ottawa", "Toronto")
+        451
+        """
+        with open(file_name, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, flags, count = _BINARY_HEADER.unpack_from(mapped)
+        if magic != BINARY_MAGIC or version not in (1, _BINARY_VERSION):
+            raise ValueError('{} is not a binary distance map'
+                             .format(file_name))
+
+        route_map = cls(symmetric=bool(flags & _SYMMETRIC_FLAG))
+        if version == _BINARY_VERSION:
+            route_map._complete = bool(flags & _COMPLETE_FLAG)
+            route_map._shortest = bool(flags & _SHORTEST_FLAG)
+        offset = _BINARY_HEADER.size
+        for _ in range(count):
+            length, = _NAME_LENGTH.unpack_from(mapped, offset)
+            offset += _NAME_LENGTH.size
+            city = mapped[offset:offset + length].decode('utf-8')
+            route_map._city_ids[city] = len(route_map._city_names)
+            route_map._city_names.append(city)
+            offset += length
+        offset += -offset % 4
+
+        cells = count * (count + 1) // 2 if route_map._symmetric \
+            else count * count
+        distances = memoryview(mapped)[offset:offset + 4 * cells].cast('i')
+        if sys.byteorder == 'big':
+            distances = array('i', distances)
+            distances.byteswap()
+        route_map._distances = distances
+        route_map._size = count
+        return route_map
+
+    def save_binary(self, file_name):
+        """Save this map to <file_name> in the binary format
+
+        See the module docstring for the layout. Whether the map is complete,
+        and whether compute_shortest_paths has run, are saved in the header.
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @type file_name: str
+        @rtype: None
         """
-        self.route = {}
+        count = len(self._city_names)
+        if self._symmetric:
+            distances = array('i', self._distances[:count * (count + 1) // 2])
+        else:
+            distances = array('i')
+            for row in range(count):
+                distances.extend(self._row(row))
+        if sys.byteorder == 'big':
+            distances.byteswap()
+        flags = _SYMMETRIC_FLAG * self._symmetric + \
+            _COMPLETE_FLAG * self.is_complete() + \
+            _SHORTEST_FLAG * self._shortest
+
+        with open(file_name, 'wb') as file:
+            file.write(_BINARY_HEADER.pack(BINARY_MAGIC, _BINARY_VERSION,
+                                           flags, count))
+            written = _BINARY_HEADER.size
+            for city in self._city_names:
+                name = city.encode('utf-8')
+                file.write(_NAME_LENGTH.pack(len(name)))
+                file.write(name)
+                written += _NAME_LENGTH.size + len(name)
+            file.write(bytes(-written % 4))
+            distances.tofile(file)
+
+    def __getstate__(self):
+        """Return the state to pickle
+
+        A memory-mapped matrix cannot be pickled, so it is copied into an
+        array. This lets a map be sent to worker processes.
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @rtype: dict[str, object]
+
+        === Examples ===
+
+        >>> import pickle
+        >>> distance_map = DistanceMap(symmetric=True)
+        >>> distance_map.add_route("Toronto", "Ottawa", 1001)
+        >>> copy = pickle.loads(pickle.dumps(distance_map))
+        >>> copy.get_route_distance("Ottawa", "Toronto")
+        1001
+        """
+        state = self.__dict__.copy()
+        if isinstance(self._distances, memoryview):
+            state['_distances'] = array('i')
+            state['_distances'].frombytes(self._distances.cast('B'))
+        return state
+
+    def add_city(self, city):
+        """Intern <city> and return its id
+
+        If <city> is already known, its existing id is returned.
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @type city: str
+        @rtype: int
+
+        === Examples ===
+
+        >>> distance_map = DistanceMap()
+        >>> distance_map.add_city("Toronto")
+        0
+        >>> distance_map.add_city("Ottawa")
+        1
+        >>> distance_map.add_city("Toronto")
+        0
+        """
+        if city in self._city_ids:
+            return self._city_ids[city]
+        city_id = len(self._city_names)
+        if city_id == self._size:
+            self._grow(max(1, 2 * self._size))
+        self._shortest = False
+        self._complete = None
+        self._city_ids[city] = city_id
+        self._city_names.append(city)
+        return city_id
+
+    def city_id(self, city):
+        """Return the id of <city>, or None if the city is not on the map
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @type city: str
+        @rtype: int | None
+        """
+        return self._city_ids.get(city)
+
+    def city_name(self, city_id):
+        """Return the name of the city with id <city_id>
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @type city_id: int
+        @rtype: str
+        """
+        return self._city_names[city_id]
+
+    def get_cities(self):
+        """Return the names of every city on the map, in id order
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @rtype: [str]
+        """
+        return list(self._city_names)
 
     def add_route(self, start_city, destination_city, distance):
         """Add a route
 
         Add a route to the database. If the route already exists, the new route
         will overwrite the previous route. However, overwriting should not exist
-        in a properly designed map-data. The routes will be saved under the key,
-        CityX_to_CityY.
+        in a properly designed map-data. Unknown cities are interned.
 
         === Parameter and Return Types ===
 
@@ -78,6 +365,10 @@ class DistanceMap:
         @rtype: None
             No return is expected
 
+        === Representation Invariants ===
+
+        0 <= distance < 2 ** 31
+
         === Examples ===
 
         >>> distance_map2 = DistanceMap()
@@ -96,8 +387,33 @@ class DistanceMap:
         9999
         >>> distance_map2.get_route_distance("India", "Canada")
         >>> distance_map2.get_route_distance("CanadaI", "ndia")
+        >>> distance_map2.add_route("Ato", "B", 5)
+        >>> distance_map2.get_route_distance("A", "toB")
+
+        >>> distance_map3 = DistanceMap(symmetric=True)
+        >>> distance_map3.add_route("A", "B", 5)
+        >>> distance_map3.add_route("B", "A", 5)
+        >>> distance_map3.is_symmetric()
+        True
+        >>> distance_map3.add_route("B", "A", 7)
+        >>> distance_map3.is_symmetric()
+        False
+        >>> distance_map3.get_route_distance("A", "B")
+        5
+        >>> distance_map3.get_route_distance("B", "A")
+        7
         """
-        self.route[start_city + "to" + destination_city] = distance
+        start_id = self.add_city(start_city)
+        destination_id = self.add_city(destination_city)
+        self._make_writable()
+        index = self._index(start_id, destination_id)
+        if self._symmetric and \
+                self._distances[index] not in (NO_ROUTE, distance):
+            self._make_dense()
+            index = self._index(start_id, destination_id)
+        self._distances[index] = distance
+        self._shortest = False
+        self._complete = None
 
     def get_route_distance(self, start_city, destination_city):
         """Get a route
@@ -142,8 +458,627 @@ class DistanceMap:
         100000
         >>> distance_map.get_route_distance("Z", "X")
         """
-        if start_city + 'to' + destination_city in self.route:
-            return self.route[start_city + "to" + destination_city]
+        start_id = self._city_ids.get(start_city)
+        destination_id = self._city_ids.get(destination_city)
+        if start_id is not None and destination_id is not None:
+            return self.get_id_distance(start_id, destination_id)
+
+    def get_id_distance(self, start_id, destination_id):
+        """Get a route by city id
+
+        Same as get_route_distance, but takes the ids returned by city_id.
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @type start_id: int
+        @type destination_id: int
+        @rtype: int | None
+
+        === Examples ===
+
+        >>> distance_map = DistanceMap()
+        >>> distance_map.add_route("A", "B", 7)
+        >>> distance_map.get_id_distance(0, 1)
+        7
+        >>> distance_map.get_id_distance(1, 0)
+        """
+        distance = self._distances[self._index(start_id, destination_id)]
+        if distance != NO_ROUTE:
+            return distance
+
+    def route_lengths(self, routes):
+        """Return the length of every route in <routes>
+
+        A route is a sequence of city names, travelled in order. The length of
+        a route with a missing leg, or with a city not on the map, is None.
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @type routes: Iterable[Sequence[str]]
+        @rtype: [int | None]
+
+        === Examples ===
+
+        >>> distance_map = DistanceMap()
+        >>> distance_map.add_route("A", "B", 1)
+        >>> distance_map.add_route("B", "C", 10)
+        >>> distance_map.route_lengths([["A", "B", "C"], ["A"], ["C", "B"],
+        ...                             ["A", "Z"]])
+        [11, 0, None, None]
+        """
+        city_ids = array('i')
+        offsets = array('i', [0])
+        unknown = []
+        for number, route in enumerate(routes):
+            route_ids = [self._city_ids.get(city) for city in route]
+            if None in route_ids:
+                unknown.append(number)
+            else:
+                city_ids.extend(route_ids)
+            offsets.append(len(city_ids))
+        lengths = self.id_route_lengths(city_ids, offsets)
+        for number in unknown:
+            lengths[number] = None
+        return lengths
+
+    def id_route_lengths(self, city_ids, offsets):
+        """Return the length of every route in a ragged array of city ids
+
+        Route r is city_ids[offsets[r]:offsets[r + 1]]. Every leg of every
+        route is gathered from the matrix in one pass, then summed per route.
+        With NumPy, the gather is one numpy.take over the flat indices of the
+        legs and the sums are one numpy.add.reduceat; without it, both are
+        Python loops. The length of a route with a missing leg is None.
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @type city_ids: Sequence[int]
+        @type offsets: Sequence[int]
+            Non-decreasing, starting at 0 and ending at len(city_ids).
+        @rtype: [int | None]
+
+        === Examples ===
+
+        >>> distance_map = DistanceMap()
+        >>> distance_map.add_route("A", "B", 1)
+        >>> distance_map.add_route("B", "C", 10)
+        >>> distance_map.id_route_lengths([0, 1, 2, 1, 2], [0, 3, 5])
+        [11, 10]
+        >>> distance_map.id_route_lengths([0, 2, 1, 0, 1], [0, 0, 2, 3, 5])
+        [0, None, 0, 1]
+        """
+        if numpy is not None:
+            return self._numpy_route_lengths(city_ids, offsets)
+        # legs[k] is the leg from city_ids[k] to city_ids[k + 1]. Legs that
+        # cross from one route to the next are gathered but never summed.
+        legs = list(map(self._distances.__getitem__,
+                        map(self._index, city_ids[:-1], city_ids[1:])))
+        lengths = []
+        for route in range(len(offsets) - 1):
+            route_legs = legs[offsets[route]:max(offsets[route],
+                                                 offsets[route + 1] - 1)]
+            if NO_ROUTE in route_legs:
+                lengths.append(None)
+            else:
+                lengths.append(sum(route_legs))
+        return lengths
+
+    def _numpy_route_lengths(self, city_ids, offsets):
+        """Return the length of every route in a ragged array of city ids,
+        gathering and summing the legs with NumPy
+
+        Leg k, from city_ids[k] to city_ids[k + 1], crosses into the next
+        route when city k is the last of its route. Those legs are zeroed,
+        so that each reduceat segment, which runs from the first leg of one
+        route to the first leg of the next route with legs, sums only the
+        legs of its own route.
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @type city_ids: Sequence[int]
+        @type offsets: Sequence[int]
+        @rtype: [int | None]
+        """
+        city_ids = numpy.asarray(city_ids, dtype=numpy.int64)
+        offsets = numpy.asarray(offsets, dtype=numpy.int64)
+        lengths = numpy.zeros(len(offsets) - 1, dtype=numpy.int64)
+        missing = numpy.zeros(len(offsets) - 1, dtype=bool)
+        if len(city_ids) > 1:
+            starts, ends = city_ids[:-1], city_ids[1:]
+            if self._symmetric:
+                rows = numpy.maximum(starts, ends)
+                flat = rows * (rows + 1) // 2 + numpy.minimum(starts, ends)
+            else:
+                flat = starts * self._size + ends
+            legs = numpy.take(
+                numpy.frombuffer(self._distances, dtype=numpy.int32),
+                flat).astype(numpy.int64)
+            gaps = legs == NO_ROUTE
+            crossings = offsets[1:] - 1
+            crossings = crossings[(crossings >= 0) &
+                                  (crossings < len(legs))]
+            legs[crossings] = 0
+            gaps[crossings] = False
+            has_legs = offsets[1:] - offsets[:-1] > 1
+            if has_legs.any():
+                first_legs = offsets[:-1][has_legs]
+                lengths[has_legs] = numpy.add.reduceat(legs, first_legs)
+                missing[has_legs] = numpy.logical_or.reduceat(gaps,
+                                                              first_legs)
+        return [None if gap else length
+                for length, gap in zip(lengths.tolist(), missing.tolist())]
+
+    def is_symmetric(self):
+        """Return True iff this map stores one distance per pair of cities
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @rtype: bool
+        """
+        return self._symmetric
+
+    def is_complete(self):
+        """Return True iff there is a route between every two different cities
+
+        The answer is kept until the map changes. A map opened by load_binary
+        knows it from the file header.
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @rtype: bool
+
+        === Examples ===
+
+        >>> distance_map = DistanceMap()
+        >>> distance_map.add_route("A", "B", 1)
+        >>> distance_map.is_complete()
+        False
+        >>> distance_map.add_route("B", "A", 1)
+        >>> distance_map.is_complete()
+        True
+        """
+        if self._complete is None:
+            # Each stored row is a contiguous slice, so it is counted in C.
+            # The row of a symmetric map holds one distance per pair.
+            self._complete = True
+            for row in range(len(self._city_names)):
+                start, stop = self._row_span(row)
+                missing = self._distances[start:stop].tolist().count(NO_ROUTE)
+                if self._distances[self._index(row, row)] == NO_ROUTE:
+                    missing -= 1
+                if missing > 0:
+                    self._complete = False
+                    break
+        return self._complete
+
+    def has_shortest_paths(self):
+        """Return True iff every distance is the length of a shortest path,
+        because compute_shortest_paths has run since the map last changed
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @rtype: bool
+        """
+        return self._shortest
+
+    def compute_shortest_paths(self, method=None):
+        """Replace every distance with the length of the shortest path
+
+        After this, get_route_distance returns the shortest distance between
+        any two connected cities (0 from a city to itself), and
+        get_route_path returns the cities along that path. Adding a route or
+        a city afterwards means the distances may no longer be shortest;
+        call this again.
+
+        <method> is 'floyd-warshall', which is O(n^3) and vectorized with
+        NumPy if it is installed, or 'dijkstra', which runs from each city and
+        is O(n * e log n) for e routes. By default, Dijkstra is used for
+        sparse maps (fewer than n^2 / 4 routes).
+
+        The matrix is updated in place, and shortest paths are read back from
+        it, so no second matrix is built. Only a memory-mapped matrix is
+        copied into an array first.
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @type method: str | None
+        @rtype: None
+
+        === Examples ===
+
+        >>> distance_map = DistanceMap()
+        >>> distance_map.add_route("A", "B", 1)
+        >>> distance_map.add_route("B", "C", 2)
+        >>> distance_map.add_route("A", "C", 10)
+        >>> distance_map.compute_shortest_paths('floyd-warshall')
+        >>> distance_map.get_route_distance("A", "C")
+        3
+        >>> distance_map.get_route_path("A", "C")
+        ['A', 'B', 'C']
+        >>> distance_map.get_route_distance("C", "A")
+        >>> distance_map.get_route_distance("C", "C")
+        0
+
+        >>> distance_map = DistanceMap()
+        >>> distance_map.add_route("A", "B", 1)
+        >>> distance_map.add_route("B", "C", 2)
+        >>> distance_map.compute_shortest_paths('dijkstra')
+        >>> distance_map.get_route_path("A", "C")
+        ['A', 'B', 'C']
+        """
+        if method not in (None, 'floyd-warshall', 'dijkstra'):
+            raise ValueError('unknown shortest path method {!r}'
+                             .format(method))
+        self._make_writable()
+        if method is None:
+            count = len(self._city_names)
+            routes = len(self._distances) - self._distances.count(NO_ROUTE)
+            method = 'dijkstra' if 4 * routes < count * count \
+                else 'floyd-warshall'
+        if method == 'floyd-warshall':
+            self._floyd_warshall()
+        else:
+            self._all_dijkstra()
+        self._shortest = True
+        self._complete = None
+
+    def get_route_path(self, start_city, destination_city):
+        """Return the cities on the route from <start_city> to
+        <destination_city>, including both
+
+        Without compute_shortest_paths, only direct routes are known. Return
+        None if there is no route.
+
+        No next hops are stored. Instead, each step of a shortest path goes to
+        the nearest city that lies on some shortest path to the destination,
+        which is O(n) per step.
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @type start_city: str
+        @type destination_city: str
+        @rtype: [str] | None
+
+        === Examples ===
+
+        >>> distance_map = DistanceMap()
+        >>> distance_map.add_route("A", "B", 1)
+        >>> distance_map.get_route_path("A", "B")
+        ['A', 'B']
+        >>> distance_map.get_route_path("B", "A")
+        """
+        if self.get_route_distance(start_city, destination_city) is None:
+            return None
+        if not self._shortest:
+            return [start_city, destination_city]
+        city = self._city_ids[start_city]
+        destination_id = self._city_ids[destination_city]
+        to_destination = self._column(destination_id)
+        path = [start_city]
+        while city != destination_id:
+            remaining = to_destination[city]
+            next_city, step = destination_id, remaining
+            for other, distance in enumerate(self._row(city)):
+                if 0 < distance < step and to_destination[other] != NO_ROUTE \
+                        and distance + to_destination[other] == remaining:
+                    next_city, step = other, distance
+            city = next_city
+            path.append(self._city_names[city])
+        return path
+
+    def _floyd_warshall(self):
+        """Replace every distance with the shortest one by Floyd-Warshall
+
+        The matrix is relaxed in place through each intermediate city k.
+        With NumPy, each pass over k is one vectorized minimum over the whole
+        matrix (see _numpy_floyd_warshall); without it, a Python loop over
+        the rows and columns. Missing routes are held as _UNREACHABLE while
+        the passes run, so that they are never shorter than a real route.
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @rtype: None
+        """
+        count = len(self._city_names)
+        distances = self._distances
+        self._replace_distance(NO_ROUTE, _UNREACHABLE)
+        for row in range(count):
+            distances[self._index(row, row)] = 0
+        if numpy is not None:
+            self._numpy_floyd_warshall()
+            self._replace_distance(_UNREACHABLE, NO_ROUTE)
+            return
+
+        for k in range(count):
+            # Row k does not change while cities are relaxed through k, so
+            # one copy serves every row.
+            row_k = self._row(k).tolist()
+            for row in range(count):
+                through_k = distances[self._index(row, k)]
+                if through_k == _UNREACHABLE or row == k:
+                    continue
+                start, stop = self._row_span(row)
+                row_distances = distances[start:stop].tolist()
+                for column, distance in enumerate(row_k[:stop - start]):
+                    if through_k + distance < row_distances[column]:
+                        distances[start + column] = through_k + distance
+        self._replace_distance(_UNREACHABLE, NO_ROUTE)
+
+    def _numpy_floyd_warshall(self):
+        """Run the Floyd-Warshall passes of _floyd_warshall with NumPy
+
+        For each k, every distance d[i][j] becomes the smaller of itself and
+        d[i][k] + d[k][j], in one vectorized minimum over the matrix. For a
+        dense matrix, that is a column of d[i][k] broadcast against row k.
+        For a symmetric matrix, d[k][j] is d[j][k], so for a block of rows the
+        sums d[i][k] + d[j][k] are broadcast into a rectangle, and a boolean
+        mask of its lower triangle, computed once per block, picks out the
+        packed entries in order. The sums are int64, so a sum with
+        _UNREACHABLE does not overflow, and the minimum always fits back into
+        int32. Rows are relaxed about _RELAX_BLOCK entries at a time, so the
+        temporaries stay small; the masks take one byte per packed entry.
+
+        === Precondition ===
+
+        Missing routes are _UNREACHABLE, and every city is 0 from itself.
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @rtype: None
+
+        === Local Variables ===
+
+        @type packed: numpy.ndarray
+            _distances, as an int32 array that shares its memory.
+        @type blocks: [(int, int, numpy.ndarray)]
+            For a symmetric matrix, the first row and the row past the last
+            of each block, and the mask of the lower triangle of its
+            rectangle.
+        @type through_k: numpy.ndarray
+            through_k[i] is the distance from city i to city k.
+        """
+        count = len(self._city_names)
+        packed = numpy.frombuffer(self._distances, dtype=numpy.int32)
+        if not self._symmetric:
+            matrix = packed.reshape(self._size, self._size)[:count, :count]
+            rows_per_block = max(1, _RELAX_BLOCK // max(count, 1))
+            for k in range(count):
+                from_k = matrix[k].astype(numpy.int64)
+                through_k = matrix[:, k].astype(numpy.int64)
+                for start in range(0, count, rows_per_block):
+                    block = matrix[start:start + rows_per_block]
+                    numpy.minimum(
+                        block,
+                        through_k[start:start + rows_per_block, None] +
+                        from_k, out=block, casting='unsafe')
+            return
+
+        # row_starts[i] is where row i of the lower triangle starts.
+        row_starts = numpy.arange(count + 1, dtype=numpy.int64)
+        row_starts = row_starts * (row_starts + 1) // 2
+        blocks = []
+        first_row = 0
+        while first_row < count:
+            last_row = first_row + 1
+            while last_row < count and \
+                    (last_row + 1 - first_row) * (last_row + 1) <= \
+                    _RELAX_BLOCK:
+                last_row += 1
+            lower = numpy.arange(last_row)[None, :] <= \
+                numpy.arange(first_row, last_row)[:, None]
+            blocks.append((first_row, last_row, lower))
+            first_row = last_row
+
+        for k in range(count):
+            # Row k holds d[k][j] for j <= k, and column k, below it, holds
+            # d[i][k] for i > k.
+            through_k = numpy.concatenate([
+                packed[row_starts[k]:row_starts[k] + k + 1],
+                packed[row_starts[k + 1:count] + k]]).astype(numpy.int64)
+            for first_row, last_row, lower in blocks:
+                block = packed[row_starts[first_row]:row_starts[last_row]]
+                numpy.minimum(
+                    block, (through_k[first_row:last_row, None] +
+                            through_k[:last_row])[lower],
+                    out=block, casting='unsafe')
+
+    def _all_dijkstra(self):
+        """Replace every distance with the shortest one by running Dijkstra's
+        algorithm from every city
+
+        Each row is written back as soon as its source is done, so only the
+        routes and one row are held in lists.
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @rtype: None
+        """
+        count = len(self._city_names)
+        neighbours = []
+        for row in range(count):
+            neighbours.append([
+                (column, distance) for column, distance in
+                enumerate(self._row(row))
+                if distance != NO_ROUTE and column != row])
+
+        for source in range(count):
+            row_distances = [_INFINITY] * count
+            row_distances[source] = 0
+            heap = [(0, source)]
+            while heap:
+                distance, city = heappop(heap)
+                if distance > row_distances[city]:
+                    continue
+                for neighbour, length in neighbours[city]:
+                    if distance + length < row_distances[neighbour]:
+                        row_distances[neighbour] = distance + length
+                        heappush(heap, (distance + length, neighbour))
+            start, stop = self._row_span(source)
+            self._distances[start:stop] = array(
+                'i', [NO_ROUTE if distance == _INFINITY else distance
+                      for distance in row_distances[:stop - start]])
+
+    def _index(self, start_id, destination_id):
+        """Return the index in _distances of the route from <start_id> to
+        <destination_id>
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @type start_id: int
+        @type destination_id: int
+        @rtype: int
+        """
+        if not self._symmetric:
+            return start_id * self._size + destination_id
+        if start_id < destination_id:
+            start_id, destination_id = destination_id, start_id
+        return start_id * (start_id + 1) // 2 + destination_id
+
+    def _row(self, row):
+        """Return the distances from city <row> to every city, in id order
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @type row: int
+        @rtype: array
+        """
+        count = len(self._city_names)
+        distances = array('i')
+        if not self._symmetric:
+            start = row * self._size
+            distances.extend(self._distances[start:start + count])
+            return distances
+        start = row * (row + 1) // 2
+        distances.extend(self._distances[start:start + row + 1])
+        distances.extend(self._distances[column * (column + 1) // 2 + row]
+                         for column in range(row + 1, count))
+        return distances
+
+    def _replace_distance(self, old, new):
+        """Replace every distance <old> in the matrix with <new>
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @type old: int
+        @type new: int
+        @rtype: None
+        """
+        if numpy is not None:
+            matrix = numpy.frombuffer(self._distances, dtype=numpy.int32)
+            # A block at a time, so that the mask stays small.
+            for start in range(0, len(matrix), 1 << 16):
+                block = matrix[start:start + (1 << 16)]
+                block[block == old] = new
+            return
+        for row in range(len(self._city_names)):
+            start, stop = self._row_span(row)
+            self._distances[start:stop] = array(
+                'i', [new if distance == old else distance
+                      for distance in self._distances[start:stop]])
+
+    def _column(self, column):
+        """Return the distances from every city to city <column>, in id order
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @type column: int
+        @rtype: array
+        """
+        if self._symmetric:
+            return self._row(column)
+        return array('i', self._distances[column:len(self._city_names) *
+                                          self._size:self._size])
+
+    def _row_span(self, row):
+        """Return the slice of _distances that holds row <row>
+
+        For a symmetric map, only the columns up to and including <row> are
+        stored in the row.
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @type row: int
+        @rtype: (int, int)
+        """
+        if self._symmetric:
+            start = row * (row + 1) // 2
+            return start, start + row + 1
+        start = row * self._size
+        return start, start + len(self._city_names)
+
+    def _make_writable(self):
+        """Copy a memory-mapped distance matrix into an array
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @rtype: None
+        """
+        if isinstance(self._distances, memoryview):
+            distances = array('i')
+            distances.frombytes(self._distances.cast('B'))
+            self._distances = distances
+
+    def _make_dense(self):
+        """Switch a symmetric map to storing the full matrix
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @rtype: None
+        """
+        rows = [self._row(row) for row in range(len(self._city_names))]
+        self._symmetric = False
+        self._distances = array('i', [NO_ROUTE]) * (self._size * self._size)
+        for row, distances in enumerate(rows):
+            start = row * self._size
+            self._distances[start:start + len(distances)] = distances
+
+    def _grow(self, size):
+        """Reallocate the distance matrix with <size> rows and columns
+
+        Existing routes are kept. Does nothing if the matrix is already at
+        least that large.
+
+        === Parameter and Return Types ===
+
+        @type self: DistanceMap
+        @type size: int
+        @rtype: None
+        """
+        if size <= self._size:
+            return
+        self._make_writable()
+        if self._symmetric:
+            # The lower triangle does not depend on the number of cities.
+            self._distances.extend(array('i', [NO_ROUTE]) * (
+                size * (size + 1) // 2 - len(self._distances)))
+            self._size = size
+            return
+        old_size = self._size
+        old_distances = self._distances
+        self._distances = array('i', [NO_ROUTE]) * (size * size)
+        for row in range(old_size):
+            self._distances[row * size:row * size + old_size] = \
+                old_distances[row * old_size:(row + 1) * old_size]
+        self._size = size
 
 if __name__ == '__main__':
     import doctest
@@ -19,7 +19,23 @@ Truck
     Instances of Truck represent a delivery truck. This class will not be
     accessed by the client. Truck is expected to be accessed by experiment.py,
     scheduler.py.
+
+Fleet
+    Indexes a list of trucks by unused space and by the cities on their
+    routes, so that the best, worst, first or a random truck for a parcel is
+    found without scanning every truck. Expected to be accessed by scheduler.py.
+
+ParcelTable
+    Stores many parcels column by column in typed arrays. Expected to be
+    accessed by experiment.py and scheduler.py when there are too many parcels
+    to hold as Parcel objects.
+
+ParcelView
+    A lightweight read-only parcel handed out by ParcelTable. Has the same
+    getters as Parcel.
 """
+from array import array
+from bisect import bisect_left, insort
 
 
 class Parcel:
@@ -46,6 +62,7 @@ class Parcel:
     _volume >= 0
         Negative volumes do not make sense
     """
+    __slots__ = ('_source_city', '_destination_city', '_volume', '_parcel_id')
 
     def __init__(self, parcel_id, source_city, destination_city, volume):
         """Initialise a parcel
@@ -120,6 +137,21 @@ class Parcel:
         """
         return self._destination_city
 
+    def get_source(self):
+        """Returns source of parcel
+
+        === Parameters and Return Types ===
+
+        @type self: Parcel
+        @rtype: str
+
+        === Examples ===
+
+        >>> Parcel(1, "Earth101", "Earth102", 11).get_source()
+        'Earth101'
+        """
+        return self._source_city
+
     def get_volume(self):
         """Returns destination of parcel
 
@@ -183,6 +215,12 @@ class Parcel:
         return self._parcel_id
 
 
+# The kinds of change recorded in a Truck's undo log.
+_LOAD = 'load'
+_UNLOAD = 'unload'
+_REORDER = 'reorder'
+
+
 class Truck:
     """A truck from a network of trucks.
 
@@ -195,14 +233,35 @@ class Truck:
         The maximum volume of parcels a truck can store.
     @type _storage: int
         The current volume of parcels stored in the truck.
-    @type _parcel_loaded: [Parcel]
-        A cummative list of stored parcels.
+    @type _parcel_loaded: dict[int, [(int, Parcel)]]
+        The stored parcels with their load numbers, by parcel id, in load
+        number order. Parcel ids should be unique, but a list is kept per id
+        in case they are not.
+    @type _loads: int
+        The load number of the next parcel loaded. Load numbers give the
+        loading order; a parcel put back by rollback keeps its old one.
+    @type _city_counts: dict[str, int]
+        The number of stored parcels going to each city.
     @type _route: [str]
         A list of cities the truck intends to travel to. The truck intends to
         travel to _route[0] first, _route[1] second, _route[2] third and so on.
         _route[0] will always be the starting city/depot.
+    @type _route_cities: set[str]
+        The cities in _route, so that city_in_route is O(1).
     @type _truck_id: int
         Truck identification number
+    @type _route_map: DistanceMap | None
+        The map used to keep track of the route distance, if any.
+    @type _distance: int
+        The sum of the known legs of _route.
+    @type _missing_legs: int
+        The number of legs of _route that have no distance on _route_map.
+    @type _undo_log: list[tuple] | None
+        The changes made since the first open checkpoint, oldest first. None
+        if there is no open checkpoint.
+    @type _fleet: Fleet | None
+        The fleet that indexes this truck, if any. It is told whenever the
+        unused space of the truck changes.
 
     === Representation Invariants ===
 
@@ -211,8 +270,12 @@ class Truck:
     _storage >= 0
         Shouldn't have negative storage
     """
+    __slots__ = ('_capacity', '_storage', '_parcel_loaded', '_loads',
+                 '_city_counts', '_route', '_route_cities', '_truck_id',
+                 '_route_map', '_distance', '_missing_legs', '_undo_log',
+                 '_fleet')
 
-    def __init__(self, truck_id, capacity, starting_city):
+    def __init__(self, truck_id, capacity, starting_city, route_map=None):
         """Create a truck
 
         Set most attributes of the truck. Most notably the storage capacity of
@@ -228,6 +291,9 @@ class Truck:
         @type starting_city: str
             The starting city of the Truck. In the experiment, the truck should
             start at the depot location.
+        @type route_map: DistanceMap | None
+            If given, the truck keeps its route distance up to date as cities
+            are added, and get_distance returns it.
         @rtype: None
 
         === Representation Invariants ===
@@ -283,9 +349,17 @@ class Truck:
         """
         self._capacity = capacity
         self._storage = 0
-        self._parcel_loaded = []
+        self._parcel_loaded = {}
+        self._loads = 0
+        self._city_counts = {}
         self._route = [starting_city]
+        self._route_cities = {starting_city}
         self._truck_id = truck_id
+        self._route_map = route_map
+        self._distance = 0
+        self._missing_legs = 0
+        self._undo_log = None
+        self._fleet = None
 
     def load_parcel(self, parcel):
         """Load a parcel
@@ -358,12 +432,455 @@ class Truck:
         >>> red_truck.city_in_route("Chicago")
         True
         """
-        self._parcel_loaded.append(parcel)
+        self._parcel_loaded.setdefault(parcel.get_id(), []).append(
+            (self._loads, parcel))
+        self._loads += 1
         destination = parcel.get_destination()
+        self._city_counts[destination] = \
+            self._city_counts.get(destination, 0) + 1
         # city_in_route determines if destination is in route.
         if not self.city_in_route(destination):
-            self._route.append(destination)
+            self._insert_city(len(self._route), destination)
+        self._storage += parcel.get_volume()
+        if self._fleet is not None:
+            self._fleet.update_truck(self)
+        if self._undo_log is not None:
+            self._undo_log.append((_LOAD, parcel))
+
+    def unload_parcel(self, parcel_id):
+        """Unload the parcel with id <parcel_id> and return it
+
+        Undoes load_parcel. If no other stored parcel goes to the parcel's
+        destination, the destination is taken off the route. Return None if no
+        such parcel is stored.
+
+        Finding the parcel is O(1). Taking a city off the route is O(len(route))
+        and only happens when its last parcel is unloaded.
+
+        === Parameter and Return Types ===
+
+        @type self: Truck
+        @type parcel_id: int
+        @rtype: Parcel | None
+
+        === Examples ===
+
+        >>> truck = Truck(1, 20, "Toronto")
+        >>> truck.load_parcel(Parcel(1, "Toronto", "Montreal", 3))
+        >>> truck.load_parcel(Parcel(2, "Toronto", "Chicago", 4))
+        >>> truck.load_parcel(Parcel(3, "Toronto", "Montreal", 5))
+        >>> truck.unload_parcel(1).get_volume()
+        3
+        >>> truck.get_route()
+        ['Toronto', 'Montreal', 'Chicago']
+        >>> truck.unload_parcel(3).get_volume()
+        5
+        >>> truck.get_route()
+        ['Toronto', 'Chicago']
+        >>> truck.get_volume()
+        4
+        >>> truck.city_in_route("Montreal")
+        False
+        >>> truck.unload_parcel(3)
+        """
+        parcel, route_index, load_number = self._unload(parcel_id)
+        if parcel is not None and self._undo_log is not None:
+            self._undo_log.append((_UNLOAD, parcel, route_index, load_number))
+        return parcel
+
+    def remove_parcel(self, parcel):
+        """Unload <parcel> itself
+
+        Like unload_parcel, but when several stored parcels share the id of
+        <parcel>, the one unloaded is <parcel> and not another of them.
+
+        === Precondition ===
+
+        <parcel> is stored in this truck.
+
+        === Parameter and Return Types ===
+
+        @type self: Truck
+        @type parcel: Parcel
+        @rtype: None
+
+        === Examples ===
+
+        >>> truck = Truck(1, 20, "Toronto")
+        >>> first = Parcel(1, "Toronto", "Montreal", 3)
+        >>> truck.load_parcel(first)
+        >>> truck.load_parcel(Parcel(1, "Toronto", "Chicago", 4))
+        >>> truck.remove_parcel(first)
+        >>> truck.get_route()
+        ['Toronto', 'Chicago']
+        """
+        _, route_index, load_number = self._unload(parcel.get_id(), parcel)
+        if self._undo_log is not None:
+            self._undo_log.append((_UNLOAD, parcel, route_index, load_number))
+
+    def distance_change(self, unloaded=None, loaded=None, missing_leg=0):
+        """Return how much the route distance would change if <unloaded> were
+        unloaded and then <loaded> were loaded
+
+        The truck is not changed. Only the legs next to the city that would
+        be taken off or added to the route are looked at, so this is O(1)
+        apart from finding the city in the route. A leg with no distance on
+        the route map counts as <missing_leg>. Without a route map, return 0.
+
+        === Parameter and Return Types ===
+
+        @type self: Truck
+        @type unloaded: Parcel | None
+            A parcel stored in this truck, or None to unload nothing.
+        @type loaded: Parcel | None
+            A parcel to load, or None to load nothing.
+        @type missing_leg: int
+        @rtype: int
+
+        === Examples ===
+
+        >>> from distance_map import DistanceMap
+        >>> route_map = DistanceMap(symmetric=True)
+        >>> route_map.add_route("Toronto", "Guelph", 100)
+        >>> route_map.add_route("Guelph", "Hamilton", 50)
+        >>> route_map.add_route("Toronto", "Hamilton", 70)
+        >>> truck = Truck(1, 10, "Toronto", route_map)
+        >>> guelph = Parcel(1, "Toronto", "Guelph", 1)
+        >>> truck.load_parcel(guelph)
+        >>> truck.load_parcel(Parcel(2, "Toronto", "Hamilton", 1))
+        >>> truck.distance_change(unloaded=guelph)
+        -80
+        >>> truck.distance_change(guelph, Parcel(3, "Toronto", "Guelph", 1))
+        -30
+        >>> truck.distance_change(loaded=Parcel(4, "Toronto", "Ottawa", 1),
+        ...                       missing_leg=1000)
+        1000
+        """
+        if self._route_map is None:
+            return 0
+        route = self._route
+        change = 0
+        removed = None
+        if unloaded is not None:
+            city = unloaded.get_destination()
+            if self._city_counts[city] == 1 and city != route[0]:
+                removed = route.index(city)
+                previous_city = route[removed - 1]
+                change -= self._leg(previous_city, city, missing_leg)
+                if removed + 1 < len(route):
+                    next_city = route[removed + 1]
+                    change += \
+                        self._leg(previous_city, next_city, missing_leg) - \
+                        self._leg(city, next_city, missing_leg)
+        if loaded is not None:
+            city = loaded.get_destination()
+            if city not in self._route_cities or \
+                    (removed is not None and route[removed] == city):
+                last = len(route) - 1
+                if last == removed:
+                    last -= 1
+                change += self._leg(route[last], city, missing_leg)
+        return change
+
+    def _leg(self, start_city, destination_city, missing_leg):
+        """Return the distance from <start_city> to <destination_city>, or
+        <missing_leg> if the route map has none
+
+        === Parameter and Return Type ===
+
+        @type self: Truck
+        @type start_city: str
+        @type destination_city: str
+        @type missing_leg: int
+        @rtype: int
+        """
+        leg = self._route_map.get_route_distance(start_city, destination_city)
+        return missing_leg if leg is None else leg
+
+    def get_parcels(self):
+        """Return the stored parcels, in loading order
+
+        A parcel put back by rollback takes its old place in the order.
+
+        === Parameter and Return Types ===
+
+        @type self: Truck
+        @rtype: [Parcel]
+
+        === Examples ===
+
+        >>> truck = Truck(1, 20, "Toronto")
+        >>> truck.load_parcel(Parcel(1, "Toronto", "Montreal", 3))
+        >>> truck.load_parcel(Parcel(2, "Toronto", "Chicago", 4))
+        >>> start = truck.checkpoint()
+        >>> truck.unload_parcel(1).get_id()
+        1
+        >>> truck.rollback(start)
+        >>> truck.commit()
+        >>> [parcel.get_id() for parcel in truck.get_parcels()]
+        [1, 2]
+        """
+        loaded = []
+        for same_id in self._parcel_loaded.values():
+            loaded.extend(same_id)
+        loaded.sort()
+        return [parcel for _, parcel in loaded]
+
+    def checkpoint(self):
+        """Open a checkpoint and return it
+
+        From now on, loads and unloads are logged so that rollback can undo
+        them. Checkpoints nest: rolling back to an earlier checkpoint also
+        undoes everything after later ones.
+
+        === Parameter and Return Types ===
+
+        @type self: Truck
+        @rtype: int
+
+        === Examples ===
+
+        >>> truck = Truck(1, 20, "Toronto")
+        >>> truck.load_parcel(Parcel(1, "Toronto", "Montreal", 3))
+        >>> start = truck.checkpoint()
+        >>> truck.load_parcel(Parcel(2, "Toronto", "Chicago", 4))
+        >>> middle = truck.checkpoint()
+        >>> truck.unload_parcel(1).get_id()
+        1
+        >>> truck.get_route()
+        ['Toronto', 'Chicago']
+        >>> truck.rollback(middle)
+        >>> truck.get_route()
+        ['Toronto', 'Montreal', 'Chicago']
+        >>> truck.rollback(start)
+        >>> truck.get_route()
+        ['Toronto', 'Montreal']
+        >>> truck.get_volume()
+        3
+        >>> truck.commit()
+        """
+        if self._undo_log is None:
+            self._undo_log = []
+        return len(self._undo_log)
+
+    def rollback(self, checkpoint):
+        """Undo every load, unload and route change made since <checkpoint>
+
+        <checkpoint> stays open, so it can be rolled back to again.
+
+        === Parameter and Return Types ===
+
+        @type self: Truck
+        @type checkpoint: int
+            A value returned by checkpoint since the last commit.
+        @rtype: None
+        """
+        while len(self._undo_log) > checkpoint:
+            change = self._undo_log.pop()
+            if change[0] == _LOAD:
+                self._unload(change[1].get_id(), change[1])
+            elif change[0] == _UNLOAD:
+                self._reload(change[1], change[2], change[3])
+            else:
+                self._reorder(change[1])
+
+    def commit(self):
+        """Keep every change and close all checkpoints
+
+        === Parameter and Return Types ===
+
+        @type self: Truck
+        @rtype: None
+        """
+        self._undo_log = None
+
+    def _unload(self, parcel_id, parcel=None):
+        """Unload the parcel with id <parcel_id> without logging it
+
+        If <parcel> is given, unload that stored parcel, which has id
+        <parcel_id>. Otherwise, unload the last loaded parcel with that id.
+
+        Return the parcel, the index its destination had in the route if the
+        destination was taken off the route, and the load number of the
+        parcel. Return (None, None, None) if no such parcel is stored.
+
+        === Parameter and Return Types ===
+
+        @type self: Truck
+        @type parcel_id: int
+        @type parcel: Parcel | None
+        @rtype: (Parcel | None, int | None, int | None)
+        """
+        same_id = self._parcel_loaded.get(parcel_id)
+        if not same_id:
+            return None, None, None
+        position = len(same_id) - 1
+        if parcel is not None:
+            while same_id[position][1] is not parcel:
+                position -= 1
+        load_number, parcel = same_id.pop(position)
+        if not same_id:
+            del self._parcel_loaded[parcel_id]
+        self._storage -= parcel.get_volume()
+        if self._fleet is not None:
+            self._fleet.update_truck(self)
+
+        destination = parcel.get_destination()
+        route_index = None
+        self._city_counts[destination] -= 1
+        if self._city_counts[destination] == 0:
+            del self._city_counts[destination]
+            # The starting city stays on the route.
+            if destination != self._route[0]:
+                route_index = self._route.index(destination)
+                self._remove_city(route_index)
+        return parcel, route_index, load_number
+
+    def _reload(self, parcel, route_index, load_number):
+        """Undo _unload of <parcel>, without logging it
+
+        === Parameter and Return Types ===
+
+        @type self: Truck
+        @type parcel: Parcel
+        @type route_index: int | None
+            The index the parcel's destination had in the route, if it was
+            taken off the route.
+        @type load_number: int
+            The load number the parcel had.
+        @rtype: None
+        """
+        # Load numbers are unique, so entries never compare parcels.
+        insort(self._parcel_loaded.setdefault(parcel.get_id(), []),
+               (load_number, parcel))
+        destination = parcel.get_destination()
+        self._city_counts[destination] = \
+            self._city_counts.get(destination, 0) + 1
+        if route_index is not None:
+            self._insert_city(route_index, destination)
         self._storage += parcel.get_volume()
+        if self._fleet is not None:
+            self._fleet.update_truck(self)
+
+    def _insert_city(self, index, city):
+        """Insert <city> at <index> of the route and update the distance
+
+        === Parameter and Return Types ===
+
+        @type self: Truck
+        @type index: int
+            0 < index <= len(self._route)
+        @type city: str
+        @rtype: None
+        """
+        previous_city = self._route[index - 1]
+        if index < len(self._route):
+            next_city = self._route[index]
+            self._add_leg(previous_city, next_city, -1)
+            self._add_leg(city, next_city, 1)
+        self._add_leg(previous_city, city, 1)
+        self._route.insert(index, city)
+        self._route_cities.add(city)
+        if self._fleet is not None:
+            self._fleet.add_route_city(self, city)
+
+    def _remove_city(self, index):
+        """Remove the city at <index> of the route and update the distance
+
+        === Parameter and Return Types ===
+
+        @type self: Truck
+        @type index: int
+            0 < index < len(self._route)
+        @rtype: None
+        """
+        city = self._route.pop(index)
+        self._route_cities.discard(city)
+        if self._fleet is not None:
+            self._fleet.remove_route_city(self, city)
+        previous_city = self._route[index - 1]
+        self._add_leg(previous_city, city, -1)
+        if index < len(self._route):
+            next_city = self._route[index]
+            self._add_leg(city, next_city, -1)
+            self._add_leg(previous_city, next_city, 1)
+
+    def set_fleet(self, fleet):
+        """Make <fleet> the fleet that indexes this truck
+
+        Only Fleet should call this. The fleet is told whenever the unused
+        space or the route of the truck changes.
+
+        === Parameter and Return Types ===
+
+        @type self: Truck
+        @type fleet: Fleet | None
+        @rtype: None
+        """
+        self._fleet = fleet
+
+    def get_fleet(self):
+        """Return the fleet that indexes this truck, or None
+
+        === Parameter and Return Types ===
+
+        @type self: Truck
+        @rtype: Fleet | None
+        """
+        return self._fleet
+
+    def get_distance(self):
+        """Return the distance of the truck's route
+
+        The distance is updated whenever a city is added to the route, so this
+        is O(1). Return None if the truck has no route map, or if a leg of the
+        route is not on the map.
+
+        === Parameter and Return Type ===
+
+        @type self: Truck
+        @rtype: int | None
+
+        === Examples ===
+
+        >>> from distance_map import DistanceMap
+        >>> route_map = DistanceMap()
+        >>> route_map.add_route("Toronto", "Guelph", 100)
+        >>> route_map.add_route("Guelph", "Hamilton", 50)
+        >>> truck = Truck(1, 10, "Toronto", route_map)
+        >>> truck.get_distance()
+        0
+        >>> truck.load_parcel(Parcel(1, "Toronto", "Guelph", 1))
+        >>> truck.load_parcel(Parcel(2, "Toronto", "Hamilton", 1))
+        >>> truck.get_distance()
+        150
+        >>> truck.load_parcel(Parcel(3, "Toronto", "Ottawa", 1))
+        >>> truck.get_distance()
+        >>> Truck(2, 10, "Toronto").get_distance()
+        """
+        if self._route_map is None or self._missing_legs > 0:
+            return None
+        return self._distance
+
+    def _add_leg(self, start_city, destination_city, sign):
+        """Add (<sign> = 1) or take away (<sign> = -1) the leg from
+        <start_city> to <destination_city> from the route distance
+
+        === Parameter and Return Type ===
+
+        @type self: Truck
+        @type start_city: str
+        @type destination_city: str
+        @type sign: int
+        @rtype: None
+        """
+        if self._route_map is None:
+            return
+        leg = self._route_map.get_route_distance(start_city, destination_city)
+        if leg is None:
+            self._missing_legs += sign
+        else:
+            self._distance += sign * leg
 
     def get_capacity(self):
         """Get truck capacity
@@ -573,7 +1090,7 @@ class Truck:
         >>> abstract_truck.city_in_route('n')
         True
         """
-        return city in self._route
+        return city in self._route_cities
 
     def get_route(self):
         """Return truck's route
@@ -622,6 +1139,60 @@ class Truck:
         """
         return self._route
 
+    def set_route(self, route):
+        """Visit the cities of the route in the order of <route>
+
+        The route distance is recomputed. Use this to apply a route found by a
+        route optimiser.
+
+        === Precondition ===
+
+        <route> holds the same cities as get_route(), and starts with the
+        same city.
+
+        === Parameter and Return Type ===
+
+        @type self: Truck
+        @type route: [str]
+        @rtype: None
+
+        === Examples ===
+
+        >>> from distance_map import DistanceMap
+        >>> route_map = DistanceMap(symmetric=True)
+        >>> route_map.add_route("a", "b", 10)
+        >>> route_map.add_route("a", "c", 1)
+        >>> route_map.add_route("b", "c", 2)
+        >>> truck = Truck(1, 10, "a", route_map)
+        >>> truck.load_parcel(Parcel(1, "a", "b", 1))
+        >>> truck.load_parcel(Parcel(2, "a", "c", 1))
+        >>> truck.get_distance()
+        12
+        >>> truck.set_route(["a", "c", "b"])
+        >>> truck.get_distance()
+        3
+        >>> truck.get_route()
+        ['a', 'c', 'b']
+        """
+        if self._undo_log is not None:
+            self._undo_log.append((_REORDER, list(self._route)))
+        self._reorder(route)
+
+    def _reorder(self, route):
+        """Replace the route with <route> without logging it
+
+        === Parameter and Return Type ===
+
+        @type self: Truck
+        @type route: [str]
+        @rtype: None
+        """
+        self._route = list(route)
+        self._distance = 0
+        self._missing_legs = 0
+        for index in range(1, len(self._route)):
+            self._add_leg(self._route[index - 1], self._route[index], 1)
+
     def get_id(self):
         """Return truck id
 
@@ -662,6 +1233,848 @@ class Truck:
         """
         return self._truck_id
 
+
+class Fleet:
+    """A list of trucks indexed by unused space and by route
+
+    The trucks are kept sorted by (unused space, position in the list) in a
+    _SortedKeys, a list of short sorted buckets, so the best fitting truck
+    for a volume is found by binary search in O(log n) instead of by a scan of
+    every truck. Ties go to the truck that comes first in the list, as they
+    would in a scan. The same kind of index is also kept per city, for the
+    trucks whose route contains that city, so the best truck already going to
+    a city is found the same way. The city indexes are only built once a
+    truck is first looked up by city. Each truck tells its fleet when its
+    unused space or route changes, so the index stays up to date whoever
+    loads the truck. A change of unused space costs a binary search and a
+    memmove of at most one bucket, O(log n + LOAD), for the fleet, and once
+    the city indexes are built, the same for each city on the truck's route.
+
+    For first fit, a segment tree over the positions holds the largest unused
+    space in every range of trucks, so the first truck with room is found by
+    walking down from the root in O(log n).
+
+    A truck belongs to at most one fleet at a time; creating a new fleet with
+    a truck takes it out of its old fleet.
+
+    === Private Attributes ===
+
+    @type _trucks: [Truck]
+        The trucks, in their original order.
+    @type _positions: dict[Truck, int]
+        Maps every truck to its index in _trucks.
+    @type _spaces: [int]
+        _spaces[i] is the unused space of _trucks[i] as last indexed.
+    @type _by_space: _SortedKeys
+        (unused space, position) for every truck.
+    @type _by_city: dict[str, _SortedKeys] | None
+        For every city, (unused space, position) for every truck whose route
+        contains the city. None until the first lookup by city.
+    @type _leaves: int
+        The number of leaves of the segment tree, the smallest power of two
+        that is at least the number of trucks.
+    @type _max_space: [int]
+        The segment tree. _max_space[_leaves + i] is the unused space of
+        _trucks[i], or -1 past the last truck, and _max_space[i] is the larger
+        of _max_space[2 * i] and _max_space[2 * i + 1].
+    """
+
+    def __init__(self, trucks):
+        """Create a fleet of <trucks>
+
+        === Parameter and Return Types ===
+
+        @type self: Fleet
+        @type trucks: Iterable[Truck]
+        @rtype: None
+
+        === Examples ===
+
+        >>> small, large = Truck(1, 10, "Toronto"), Truck(2, 30, "Toronto")
+        >>> fleet = Fleet([large, small])
+        >>> fleet.best_fit(5).get_id()
+        1
+        >>> fleet.worst_fit(5).get_id()
+        2
+        >>> large.load_parcel(Parcel(1, "Toronto", "Ottawa", 25))
+        >>> fleet.worst_fit(5).get_id()
+        1
+        >>> fleet.best_fit(11)
+        >>> fleet.best_fit(1, "Ottawa").get_id()
+        2
+        >>> fleet.best_fit(1, "Guelph")
+        >>> fleet.first_fit(5).get_id()
+        2
+        """
+        self._trucks = list(trucks)
+        self._positions = {}
+        self._spaces = []
+        for position, truck in enumerate(self._trucks):
+            truck.set_fleet(self)
+            self._positions[truck] = position
+            self._spaces.append(truck.get_unused_space())
+        self._by_space = _SortedKeys((space, position) for position, space
+                                  in enumerate(self._spaces))
+        self._by_city = None
+        self._leaves = 1
+        while self._leaves < len(self._trucks):
+            self._leaves *= 2
+        self._max_space = [-1] * (2 * self._leaves)
+        self._max_space[self._leaves:self._leaves + len(self._spaces)] = \
+            self._spaces
+        for node in range(self._leaves - 1, 0, -1):
+            self._max_space[node] = max(self._max_space[2 * node],
+                                        self._max_space[2 * node + 1])
+
+    def detach(self):
+        """Stop indexing the trucks of the fleet
+
+        Each truck stops telling this fleet about its changes, so loading it
+        later no longer costs an index update. A truck that a newer fleet
+        has taken over stays in that fleet. The fleet must not be used
+        afterwards. Schedulers call this when they finish with their fleet.
+
+        === Parameter and Return Types ===
+
+        @type self: Fleet
+        @rtype: None
+
+        === Examples ===
+
+        >>> truck = Truck(1, 10, "Toronto")
+        >>> fleet = Fleet([truck])
+        >>> fleet.detach()
+        >>> truck.get_fleet() is None
+        True
+        >>> old_fleet = Fleet([truck])
+        >>> new_fleet = Fleet([truck])
+        >>> old_fleet.detach()
+        >>> truck.get_fleet() is new_fleet
+        True
+        >>> truck.load_parcel(Parcel(1, "Toronto", "Ottawa", 4))
+        >>> new_fleet.best_fit(7)
+        """
+        for truck in self._trucks:
+            if truck.get_fleet() is self:
+                truck.set_fleet(None)
+
+    def get_trucks(self):
+        """Return the trucks of the fleet, in their original order
+
+        === Parameter and Return Types ===
+
+        @type self: Fleet
+        @rtype: [Truck]
+        """
+        return self._trucks
+
+    def __len__(self):
+        """Return the number of trucks in the fleet
+
+        @type self: Fleet
+        @rtype: int
+        """
+        return len(self._trucks)
+
+    def __iter__(self):
+        """Return an iterator over the trucks, in their original order
+
+        @type self: Fleet
+        @rtype: Iterator[Truck]
+        """
+        return iter(self._trucks)
+
+    def best_fit(self, volume, city=None, exclude=None):
+        """Return the truck with the least unused space that is at least
+        <volume>, or None if no truck has room
+
+        If <city> is given, only trucks whose route contains <city> are
+        considered. The truck <exclude>, if given, is never returned.
+
+        === Parameter and Return Types ===
+
+        @type self: Fleet
+        @type volume: int
+        @type city: str | None
+        @type exclude: Truck | None
+        @rtype: Truck | None
+
+        === Examples ===
+
+        >>> small, large = Truck(1, 10, "Toronto"), Truck(2, 30, "Toronto")
+        >>> fleet = Fleet([small, large])
+        >>> fleet.best_fit(5, exclude=small).get_id()
+        2
+        >>> fleet.best_fit(5, exclude=large).get_id()
+        1
+        >>> fleet.best_fit(20, exclude=large)
+        """
+        by_space = self._space_index(city)
+        key = by_space.ceiling((volume, -1))
+        if key is not None and exclude is not None and \
+                key[1] == self._positions[exclude]:
+            key = by_space.ceiling((key[0], key[1] + 1))
+        if key is None:
+            return None
+        return self._trucks[key[1]]
+
+    def worst_fit(self, volume, city=None):
+        """Return the truck with the most unused space, or None if it does not
+        have room for <volume>
+
+        If <city> is given, only trucks whose route contains <city> are
+        considered.
+
+        === Parameter and Return Types ===
+
+        @type self: Fleet
+        @type volume: int
+        @type city: str | None
+        @rtype: Truck | None
+        """
+        by_space = self._space_index(city)
+        largest = by_space.last()
+        if largest is None or largest[0] < volume:
+            return None
+        return self._trucks[by_space.ceiling((largest[0], -1))[1]]
+
+    def random_fit(self, volume, pick_index):
+        """Return a truck chosen uniformly at random among the trucks with at
+        least <volume> unused space, or None if no truck has room
+
+        Those trucks are the end of the sorted space index. Their number, and
+        the truck at a random rank among them, are found by binary search and
+        by summing bucket lengths, so only one random index is drawn. The chance of each truck being chosen is the
+        same as with random.choice on a list of them, and the same random
+        numbers are drawn.
+
+        === Parameter and Return Types ===
+
+        @type self: Fleet
+        @type volume: int
+        @type pick_index: Callable[[int], int]
+            Returns a random integer in range(n) for n, like random.randrange.
+        @rtype: Truck | None
+
+        === Examples ===
+
+        >>> fleet = Fleet([Truck(1, 5, "Toronto"), Truck(2, 20, "Toronto"),
+        ...                Truck(3, 30, "Toronto")])
+        >>> fleet.random_fit(10, lambda count: count - 1).get_id()
+        3
+        >>> fleet.random_fit(10, lambda count: 0).get_id()
+        2
+        >>> fleet.random_fit(31, lambda count: 0)
+        """
+        rank = self._by_space.rank((volume, -1))
+        count = len(self._by_space) - rank
+        if count == 0:
+            return None
+        return self._trucks[self._by_space.select(rank + pick_index(count))[1]]
+
+    def first_fit(self, volume):
+        """Return the first truck in the fleet with at least <volume> unused
+        space, or None if no truck has room
+
+        === Parameter and Return Types ===
+
+        @type self: Fleet
+        @type volume: int
+        @rtype: Truck | None
+
+        === Examples ===
+
+        >>> trucks = [Truck(1, 5, "Toronto"), Truck(2, 20, "Toronto"),
+        ...           Truck(3, 30, "Toronto")]
+        >>> fleet = Fleet(trucks)
+        >>> fleet.first_fit(10).get_id()
+        2
+        >>> trucks[1].load_parcel(Parcel(1, "Toronto", "Ottawa", 15))
+        >>> fleet.first_fit(10).get_id()
+        3
+        >>> fleet.first_fit(31)
+        """
+        if not self._trucks or self._max_space[1] < volume:
+            return None
+        node = 1
+        while node < self._leaves:
+            node *= 2
+            if self._max_space[node] < volume:
+                node += 1
+        return self._trucks[node - self._leaves]
+
+    def _space_index(self, city):
+        """Return the (unused space, position) index of the trucks going to
+        <city>, or of every truck if <city> is None
+
+        === Parameter and Return Types ===
+
+        @type self: Fleet
+        @type city: str | None
+        @rtype: _SortedKeys
+        """
+        if city is None:
+            return self._by_space
+        if self._by_city is None:
+            self._by_city = {}
+            for truck in self._trucks:
+                for route_city in truck.get_route():
+                    self.add_route_city(truck, route_city)
+        return self._by_city.get(city, _NO_KEYS)
+
+    def update_truck(self, truck):
+        """Re-index <truck> after its unused space changed
+
+        Called by Truck.
+
+        === Parameter and Return Types ===
+
+        @type self: Fleet
+        @type truck: Truck
+        @rtype: None
+        """
+        position = self._positions[truck]
+        space = truck.get_unused_space()
+        old_key = (self._spaces[position], position)
+        if space == old_key[0]:
+            return
+        new_key = (space, position)
+        self._by_space.replace(old_key, new_key)
+        if self._by_city is not None:
+            for city in truck.get_route():
+                self._by_city[city].replace(old_key, new_key)
+        self._spaces[position] = space
+        node = self._leaves + position
+        self._max_space[node] = space
+        while node > 1:
+            node //= 2
+            self._max_space[node] = max(self._max_space[2 * node],
+                                        self._max_space[2 * node + 1])
+
+    def add_route_city(self, truck, city):
+        """Index <truck> under <city>, which was added to its route
+
+        Called by Truck.
+
+        === Parameter and Return Types ===
+
+        @type self: Fleet
+        @type truck: Truck
+        @type city: str
+        @rtype: None
+        """
+        if self._by_city is None:
+            return
+        position = self._positions[truck]
+        if city not in self._by_city:
+            self._by_city[city] = _SortedKeys()
+        self._by_city[city].add((self._spaces[position], position))
+
+    def remove_route_city(self, truck, city):
+        """Stop indexing <truck> under <city>, which was taken off its route
+
+        Called by Truck.
+
+        === Parameter and Return Types ===
+
+        @type self: Fleet
+        @type truck: Truck
+        @type city: str
+        @rtype: None
+        """
+        if self._by_city is None:
+            return
+        position = self._positions[truck]
+        self._by_city[city].remove((self._spaces[position], position))
+
+
+class _SortedKeys:
+    """A sorted set of keys in a list of short sorted lists
+
+    Each bucket is a sorted list of at most 2 * LOAD keys, and every key of a
+    bucket is smaller than every key of the next. The largest key of every
+    bucket is kept in _maxes, so the bucket of a key is found by bisecting
+    _maxes, and the key by bisecting its bucket. Adding or removing a key
+    shifts only the rest of its bucket, O(LOAD) in one memmove, instead of the
+    rest of a single list of n keys. A bucket that grows past 2 * LOAD keys is
+    split in two.
+
+    Finding the smallest key at least as large as a given one is
+    O(log n). Ranks sum the lengths of the buckets before, so rank and select
+    are O(n / LOAD) in C plus O(log n).
+
+    === Private Attributes ===
+
+    @type _buckets: [list]
+        The keys, in sorted order, split into non-empty buckets.
+    @type _maxes: [object]
+        _maxes[i] is the largest key of _buckets[i].
+    @type _size: int
+        The number of keys.
+
+    === Class Attributes ===
+
+    @type LOAD: int
+        The number of keys in a bucket after a split.
+
+    === Representation Invariants ===
+
+    - the keys are distinct
+    - every bucket has between 1 and 2 * LOAD keys
+    """
+    LOAD = 512
+
+    def __init__(self, keys=()):
+        """Create a set that holds every key of <keys>
+
+        === Parameter and Return Types ===
+
+        @type self: _SortedKeys
+        @type keys: Iterable[object]
+        @rtype: None
+
+        === Examples ===
+
+        >>> sorted_keys = _SortedKeys([5, 1, 3])
+        >>> [sorted_keys.select(rank) for rank in range(len(sorted_keys))]
+        [1, 3, 5]
+        >>> sorted_keys.remove(3)
+        >>> sorted_keys.ceiling(2), sorted_keys.ceiling(6), sorted_keys.last()
+        (5, None, 5)
+        >>> sorted_keys.rank(5)
+        1
+        """
+        keys = sorted(keys)
+        self._buckets = [keys[start:start + self.LOAD]
+                         for start in range(0, len(keys), self.LOAD)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._size = len(keys)
+
+    def __len__(self):
+        """Return the number of keys
+
+        @type self: _SortedKeys
+        @rtype: int
+        """
+        return self._size
+
+    def add(self, key):
+        """Add <key>
+
+        === Precondition ===
+
+        <key> is not in the set.
+
+        === Parameter and Return Types ===
+
+        @type self: _SortedKeys
+        @type key: object
+        @rtype: None
+
+        === Examples ===
+
+        >>> sorted_keys = _SortedKeys()
+        >>> sorted_keys.LOAD = 2
+        >>> for key in [4, 2, 8, 6, 1, 3, 7, 5, 9]:
+        ...     sorted_keys.add(key)
+        >>> sorted_keys._buckets
+        [[1, 2], [3, 4], [5, 6], [7, 8, 9]]
+        >>> sorted_keys.rank(6), sorted_keys.select(4)
+        (5, 5)
+        """
+        self._size += 1
+        maxes = self._maxes
+        if not maxes:
+            self._buckets.append([key])
+            maxes.append(key)
+            return
+        index = bisect_left(maxes, key)
+        if index == len(maxes):
+            index -= 1
+            bucket = self._buckets[index]
+            bucket.append(key)
+            maxes[index] = key
+        else:
+            bucket = self._buckets[index]
+            insort(bucket, key)
+        if len(bucket) > 2 * self.LOAD:
+            self._buckets[index:index + 1] = [bucket[:self.LOAD],
+                                              bucket[self.LOAD:]]
+            maxes[index:index + 1] = [bucket[self.LOAD - 1], bucket[-1]]
+
+    def remove(self, key):
+        """Remove <key>
+
+        === Precondition ===
+
+        <key> is in the set.
+
+        === Parameter and Return Types ===
+
+        @type self: _SortedKeys
+        @type key: object
+        @rtype: None
+        """
+        self._size -= 1
+        index = bisect_left(self._maxes, key)
+        bucket = self._buckets[index]
+        del bucket[bisect_left(bucket, key)]
+        if bucket:
+            self._maxes[index] = bucket[-1]
+        else:
+            del self._buckets[index]
+            del self._maxes[index]
+
+    def replace(self, old_key, new_key):
+        """Remove <old_key> and add <new_key>
+
+        When <new_key> belongs in the bucket of <old_key>, as it does for a
+        small change of unused space, or when the set fits in one bucket, as
+        the index of a city usually does, the bucket is updated in place like
+        a plain sorted list.
+
+        === Precondition ===
+
+        <old_key> is in the set and <new_key> is not.
+
+        === Parameter and Return Types ===
+
+        @type self: _SortedKeys
+        @type old_key: object
+        @type new_key: object
+        @rtype: None
+
+        === Examples ===
+
+        >>> sorted_keys = _SortedKeys([1, 3, 5])
+        >>> sorted_keys.replace(3, 6)
+        >>> [sorted_keys.select(rank) for rank in range(len(sorted_keys))]
+        [1, 5, 6]
+        """
+        buckets, maxes = self._buckets, self._maxes
+        index = bisect_left(maxes, old_key) if len(maxes) > 1 else 0
+        if (index == 0 or maxes[index - 1] < new_key) and \
+                (index + 1 == len(buckets) or new_key < buckets[index + 1][0]):
+            bucket = buckets[index]
+            del bucket[bisect_left(bucket, old_key)]
+            insort(bucket, new_key)
+            maxes[index] = bucket[-1]
+        else:
+            self.remove(old_key)
+            self.add(new_key)
+
+    def ceiling(self, key):
+        """Return the smallest key that is at least <key>, or None if there is
+        none
+
+        === Parameter and Return Types ===
+
+        @type self: _SortedKeys
+        @type key: object
+        @rtype: object | None
+        """
+        index = bisect_left(self._maxes, key)
+        if index == len(self._maxes):
+            return None
+        bucket = self._buckets[index]
+        return bucket[bisect_left(bucket, key)]
+
+    def last(self):
+        """Return the largest key, or None if there are no keys
+
+        === Parameter and Return Types ===
+
+        @type self: _SortedKeys
+        @rtype: object | None
+        """
+        return self._maxes[-1] if self._maxes else None
+
+    def rank(self, key):
+        """Return the number of keys smaller than <key>
+
+        === Parameter and Return Types ===
+
+        @type self: _SortedKeys
+        @type key: object
+        @rtype: int
+        """
+        index = bisect_left(self._maxes, key)
+        if index == len(self._maxes):
+            return self._size
+        return sum(map(len, self._buckets[:index])) + \
+            bisect_left(self._buckets[index], key)
+
+    def select(self, rank):
+        """Return the key with <rank> smaller keys
+
+        === Precondition ===
+
+        0 <= rank < len(self)
+
+        === Parameter and Return Types ===
+
+        @type self: _SortedKeys
+        @type rank: int
+        @rtype: object
+        """
+        for bucket in self._buckets:
+            if rank < len(bucket):
+                return bucket[rank]
+            rank -= len(bucket)
+        raise IndexError(rank)
+
+
+# The index of a city no truck is going to.
+_NO_KEYS = _SortedKeys()
+
+
+class ParcelTable:
+    """A table of parcels stored column by column
+
+    Each parcel is a row. The id, source city, destination city and volume of
+    every parcel are kept in four typed arrays, and cities are stored as
+    integer codes, so a parcel costs a few bytes instead of a whole object.
+    Indexing or iterating the table hands out ParcelView objects, which have
+    the same getters as Parcel, so a ParcelTable can be scheduled like a list
+    of parcels. Code that only needs one attribute can read its column
+    directly.
+
+    === Private Attributes ===
+
+    @type _ids: array
+        _ids[row] is the id of the parcel in <row>.
+    @type _sources: array
+        _sources[row] is the city code of the source of the parcel in <row>.
+    @type _destinations: array
+        _destinations[row] is the city code of the destination of the parcel
+        in <row>.
+    @type _volumes: array
+        _volumes[row] is the volume of the parcel in <row>.
+    @type _city_codes: dict[str, int]
+        Maps every city name in the table to its code.
+    @type _city_names: [str]
+        _city_names[code] is the name of the city with that code.
+
+    === Representation Invariants ===
+
+    The four columns have the same length.
+    Every volume >= 0
+    """
+
+    def __init__(self, parcels=()):
+        """Create a table holding <parcels>
+
+        === Parameter and Return Types ===
+
+        @type self: ParcelTable
+        @type parcels: Iterable[Parcel]
+        @rtype: None
+
+        === Examples ===
+
+        >>> table = ParcelTable([Parcel(7, "Toronto", "Ottawa", 3)])
+        >>> table.append(8, "Ottawa", "Toronto", 5)
+        >>> len(table)
+        2
+        >>> table[1].get_destination()
+        'Toronto'
+        >>> [parcel.get_id() for parcel in table]
+        [7, 8]
+        >>> list(table.get_volumes())
+        [3, 5]
+        >>> [table.get_city_name(code) for code in table.get_destinations()]
+        ['Ottawa', 'Toronto']
+        """
+        self._ids = array('q')
+        self._sources = array('i')
+        self._destinations = array('i')
+        self._volumes = array('q')
+        self._city_codes = {}
+        self._city_names = []
+        for parcel in parcels:
+            self.append(parcel.get_id(), parcel.get_source(),
+                        parcel.get_destination(), parcel.get_volume())
+
+    def append(self, parcel_id, source_city, destination_city, volume):
+        """Add a parcel to the end of the table
+
+        === Parameter and Return Types ===
+
+        @type self: ParcelTable
+        @type parcel_id: int
+        @type source_city: str
+        @type destination_city: str
+        @type volume: int
+        @rtype: None
+        """
+        self._ids.append(parcel_id)
+        self._sources.append(self.get_city_code(source_city))
+        self._destinations.append(self.get_city_code(destination_city))
+        self._volumes.append(volume)
+
+    def get_city_code(self, city):
+        """Return the code of <city>, giving it a new code if needed
+
+        === Parameter and Return Types ===
+
+        @type self: ParcelTable
+        @type city: str
+        @rtype: int
+        """
+        code = self._city_codes.get(city)
+        if code is None:
+            code = self._city_codes[city] = len(self._city_names)
+            self._city_names.append(city)
+        return code
+
+    def get_city_name(self, code):
+        """Return the name of the city with code <code>
+
+        === Parameter and Return Types ===
+
+        @type self: ParcelTable
+        @type code: int
+        @rtype: str
+        """
+        return self._city_names[code]
+
+    def get_ids(self):
+        """Return the id column. Do not mutate it.
+
+        @type self: ParcelTable
+        @rtype: array
+        """
+        return self._ids
+
+    def get_sources(self):
+        """Return the source city code column. Do not mutate it.
+
+        @type self: ParcelTable
+        @rtype: array
+        """
+        return self._sources
+
+    def get_destinations(self):
+        """Return the destination city code column. Do not mutate it.
+
+        @type self: ParcelTable
+        @rtype: array
+        """
+        return self._destinations
+
+    def get_volumes(self):
+        """Return the volume column. Do not mutate it.
+
+        @type self: ParcelTable
+        @rtype: array
+        """
+        return self._volumes
+
+    def __len__(self):
+        """Return the number of parcels in the table
+
+        @type self: ParcelTable
+        @rtype: int
+        """
+        return len(self._ids)
+
+    def __getitem__(self, row):
+        """Return a view of the parcel in <row>, or a list of views if <row> is
+        a slice
+
+        === Parameter and Return Types ===
+
+        @type self: ParcelTable
+        @type row: int | slice
+        @rtype: ParcelView | [ParcelView]
+
+        === Examples ===
+
+        >>> table = ParcelTable()
+        >>> table.append(1, "A", "B", 2)
+        >>> table.append(2, "B", "A", 3)
+        >>> [parcel.get_volume() for parcel in table[:]]
+        [2, 3]
+        >>> table[-1].get_id()
+        2
+        """
+        if isinstance(row, slice):
+            return [ParcelView(self, one_row)
+                    for one_row in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError('parcel table index out of range')
+        return ParcelView(self, row)
+
+    def __iter__(self):
+        """Return an iterator over views of every parcel, in row order
+
+        @type self: ParcelTable
+        @rtype: Iterator[ParcelView]
+        """
+        return (ParcelView(self, row) for row in range(len(self)))
+
+
+class ParcelView:
+    """A read-only view of one row of a ParcelTable
+
+    Has the same getters as Parcel. Views hold no parcel data, so they are
+    cheap to create and throw away.
+
+    === Private Attributes ===
+
+    @type _table: ParcelTable
+        The table that holds the parcel.
+    @type _row: int
+        The row of the parcel in _table.
+    """
+    __slots__ = ('_table', '_row')
+
+    def __init__(self, table, row):
+        """Create a view of <row> in <table>
+
+        @type self: ParcelView
+        @type table: ParcelTable
+        @type row: int
+        @rtype: None
+        """
+        self._table = table
+        self._row = row
+
+    def get_id(self):
+        """Returns parcel id
+
+        @type self: ParcelView
+        @rtype: int
+        """
+        return self._table.get_ids()[self._row]
+
+    def get_source(self):
+        """Returns source of parcel
+
+        @type self: ParcelView
+        @rtype: str
+        """
+        return self._table.get_city_name(self._table.get_sources()[self._row])
+
+    def get_destination(self):
+        """Returns destination of parcel
+
+        @type self: ParcelView
+        @rtype: str
+        """
+        return self._table.get_city_name(
+            self._table.get_destinations()[self._row])
+
+    def get_volume(self):
+        """Returns volume of parcel
+
+        @type self: ParcelView
+        @rtype: int
+        """
+        return self._table.get_volumes()[self._row]
+
 if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config='.pylintrc')
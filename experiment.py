@@ -20,8 +20,14 @@ SchedulingExperiment
 read_parcels
     Read parcel data from .txt files
 
+read_parcel_table
+    Read parcel data from .txt files into a compact ParcelTable
+
 read_distance_map
-    Read map data from .txt files
+    Read map data from .txt files, or open a binary map file
+
+convert_distance_map
+    Convert a .txt map file to the binary map format
 
 read_trucks
     Read truck data from .txt documents
@@ -30,9 +36,10 @@ sanity_check
     Run a single experiment using desired settings. Settings can be edited in
     /data/demo.json
 """
-from scheduler import RandomScheduler, GreedyScheduler
-from domain import Parcel, Truck
-from distance_map import DistanceMap
+from scheduler import ImprovingScheduler, create_scheduler
+from domain import Parcel, Truck, ParcelTable
+from distance_map import DistanceMap, BINARY_MAGIC
+from route_optimizer import RouteOptimizer
 
 
 class SchedulingExperiment:
@@ -74,8 +81,8 @@ class SchedulingExperiment:
         how the scheduler behaves.
     @type _unscheduled: [Parcel]
         A list of unscheduled parcels.
-    @type _parcel_list: [Parcel]
-        A list of parcels
+    @type _parcel_list: [Parcel] | ParcelTable
+        A list of parcels, or a ParcelTable if the configuration asks for one
     @type _truck_list: [Truck]
         A list of trucks
     @type _route_map: DistanceMap
@@ -90,6 +97,19 @@ class SchedulingExperiment:
         "truck_file", "map_file", "algorithm", "parcel_priority", "parcel_order"
         "truck_order", "verbose"
 
+        If config['parcel_storage'] is 'table', the parcels are read into a
+        ParcelTable, which takes far less memory than a list of parcels for
+        large parcel files. Otherwise they are read into a list.
+
+        If config['shortest_paths'] is 'true', every distance on the map is
+        replaced with the length of the shortest path, unless the map file
+        was saved that way. If it is 'false', the map is used as it is. By
+        default, shortest paths are computed only when a route between two
+        cities is missing. A binary map file records whether it is complete,
+        so it is not scanned. Computing shortest paths copies a memory-mapped
+        matrix into memory, so large maps are better converted with
+        convert_distance_map(..., shortest_paths=True).
+
         === Parameter and Return Types ===
 
         @type self: SchedulingExperiment
@@ -101,10 +121,24 @@ class SchedulingExperiment:
         self._config = config
         self._unscheduled = []
 
-        self._parcel_list = read_parcels(config['parcel_file'])
-        self._truck_list = read_trucks(config['truck_file'],
-                                       config['depot_location'])
+        if config.get('parcel_storage') == 'table':
+            self._parcel_list = read_parcel_table(config['parcel_file'])
+        else:
+            self._parcel_list = read_parcels(config['parcel_file'])
         self._route_map = read_distance_map(config['map_file'])
+        # Sparse road networks do not list a route between every two cities.
+        # Fill in the gaps so every leg of a truck route has a distance.
+        if config.get('shortest_paths') == 'true':
+            precompute = not self._route_map.has_shortest_paths()
+        elif config.get('shortest_paths') == 'false':
+            precompute = False
+        else:
+            precompute = not self._route_map.is_complete()
+        if precompute:
+            self._route_map.compute_shortest_paths()
+        self._truck_list = read_trucks(config['truck_file'],
+                                       config['depot_location'],
+                                       self._route_map)
 
     def run(self, report=False):
         """Run the experiment and return statistics on the outcome.
@@ -117,9 +151,27 @@ class SchedulingExperiment:
 
         === Precondition ===
 
+        self._config['algorithm'] is the name of a registered scheduler, one
+        of scheduler.list_schedulers(). The scheduler takes the configuration
+        keys it declared when registered, for example:
+
         self._config['parcel_priority'] = 'volume' or 'destination
         self._config['parcel_order'] = 'non-increasing' or 'non-decreasing'
         self._config['truck_order'] = 'non-increasing' or 'non-decreasing'
+        self._config['seed'], the seed of a random scheduler
+        self._config['trials'] and self._config['objective'], the number of
+            'multi-random' trials and how the best one is chosen
+        self._config['window'], the look-ahead window of 'online'
+        self._config['base'], the scheduler whose schedule 'improving'
+            improves (default 'greedy')
+
+        If self._config['improve'] is 'true', the schedule is improved by local
+        search for at most self._config['improve_time_limit'] seconds
+        (default 1).
+
+        If self._config['optimize_routes'] is 'true', the route of every truck
+        is reordered after scheduling to shorten it, spending at most
+        self._config['route_time_budget'] seconds (default 1) per truck.
 
         === Parameter and Return Types ===
 
@@ -133,16 +185,19 @@ class SchedulingExperiment:
             'unscheduled'
         """
 
-        if self._config['algorithm'] == 'random':
-            scheduler = RandomScheduler(self._route_map)
-        else:
-            scheduler = GreedyScheduler(self._config['parcel_priority'],
-                                        self._config['parcel_order'],
-                                        self._config['truck_order'],
-                                        self._route_map)
+        scheduler = create_scheduler(self._config['algorithm'], self._config,
+                                     self._route_map)
+        if self._config.get('improve') == 'true':
+            scheduler = ImprovingScheduler(
+                scheduler, float(self._config.get('improve_time_limit', 1)))
         self._unscheduled = scheduler.schedule(
             self._parcel_list, self._truck_list,
             self._config['verbose'] == 'true')
+        if self._config.get('optimize_routes') == 'true':
+            optimizer = RouteOptimizer(
+                self._route_map,
+                float(self._config.get('route_time_budget', 1)))
+            optimizer.optimize(self._truck_list)
         if report is True:
             print(self._compute_stats())
         return self._compute_stats()
@@ -162,6 +217,11 @@ class SchedulingExperiment:
             'unused_trucks', 'avg_distance', 'avg_fullness', 'unused_space',
             'unscheduled'
 
+        Raises ValueError, naming the truck and its route, if a route has a
+        leg with no known distance. That happens when a destination cannot
+        be reached on the map, or when config['shortest_paths'] is 'false'
+        and the map lacks a direct route between two cities of a route.
+
         === Local Variables ===
 
         type statistics: Dict[str, int | float]
@@ -179,15 +239,11 @@ class SchedulingExperiment:
             Total unused storage space.
         type truck: Truck
             A single truck
-        type route_travelled: [str]
-            A list of cities to travel to. The truck starts in
-            route_travelled[0] and travels to each city within the list in the
-            order of the list.
+        type travelled_distances: [int]
+            travelled_distances[i] is the total distance travelled by
+            used_trucks[i], along its route.
         type travelled_distance: int
             Total distance travelled by a single truck
-        type trip: int
-            A single trip between 2 cities. The value is a bit abstract. <trip>
-            holds the index of <route_travelled>
 
         === Representation Invariants ===
 
@@ -200,8 +256,6 @@ class SchedulingExperiment:
             Negative unused space makes no sense
         travelled_distance >= 0
             Negative distance does not make sense
-        trip >= 0
-            Index of -1 does not exist
         """
         statistics = {}
         unused_trucks = []
@@ -222,14 +276,18 @@ class SchedulingExperiment:
 
         statistics['unused_trucks'] = len(unused_trucks)
 
-        for truck in used_trucks:
-            route_travelled = truck.get_route()
-            travelled_distance = 0
-            for trip in range(len(route_travelled) - 1):
-                travelled_distance += self._route_map\
-                    .get_route_distance(route_travelled[trip],
-                                        route_travelled[trip + 1])
-
+        # Trucks keep their route distance up to date as they are loaded.
+        # Otherwise, every leg of every route is looked up in a single batch.
+        travelled_distances = [truck.get_distance() for truck in used_trucks]
+        if None in travelled_distances:
+            travelled_distances = self._route_map.route_lengths(
+                [truck.get_route() for truck in used_trucks])
+        for truck, travelled_distance in zip(used_trucks,
+                                             travelled_distances):
+            if travelled_distance is None:
+                raise ValueError(
+                    "No distance is known along the route of truck {}: {}"
+                    .format(truck.get_id(), ' -> '.join(truck.get_route())))
             total_distance += travelled_distance
             total_fullness += truck.get_fullness()
 
@@ -300,12 +358,40 @@ def read_parcels(parcel_file):
     return parcel_list
 
 
+def read_parcel_table(parcel_file):
+    """Read parcel data from <parcel_file> into a ParcelTable
+
+    Same as read_parcels, but the parcels are stored column by column, which
+    takes far less memory for large files. The table can be scheduled like the
+    list returned by read_parcels.
+
+    === Parameter and Return Types ===
+
+    @type parcel_file: str
+        The name of a file containing parcel data in the form specified in
+        Assignment 1.
+    @rtype: ParcelTable
+    """
+    parcel_table = ParcelTable()
+
+    with open(parcel_file, 'r') as file:
+        for line in file:
+            tokens = line.strip().split(',')
+            parcel_table.append(int(tokens[0].strip()), tokens[1].strip(),
+                                tokens[2].strip(), int(tokens[3].strip()))
+
+    return parcel_table
+
+
 def read_distance_map(distance_map_file):
     """Read distance data from <distance_map_file>
 
     A file containing route data is added to a map object. The returned map
     object contains all routes present in the .txt file.
 
+    If <distance_map_file> is in the binary format written by
+    convert_distance_map, it is memory-mapped instead of parsed.
+
     === Parameter and Return Types ===
 
     @type distance_map_file: str
@@ -331,6 +417,12 @@ def read_distance_map(distance_map_file):
     type dist: Truck
         The distance from <c1> to <c2>. Note, <c1> to <c2> may have a different
         distance compared to <c2> to <c1>. Imagine it like a one way route.
+    type routes: dict[(str, str), int]
+        Every route read from the file, in file order.
+    type cities: dict[str, None]
+        Every city read from the file, in order of first appearance.
+    type symmetric: bool
+        Whether every route has the same distance in both directions.
 
     === Representation Invariants ===
 
@@ -338,19 +430,61 @@ def read_distance_map(distance_map_file):
         Negative distance does not make sense.
     """
 
-    route_map = DistanceMap()
+    with open(distance_map_file, 'rb') as file:
+        if file.read(len(BINARY_MAGIC)) == BINARY_MAGIC:
+            return DistanceMap.load_binary(distance_map_file)
+
+    routes = {}
+    cities = {}
     with open(distance_map_file, 'r') as file:
         for line in file:
             tokens = line.strip().split(',')
             c1 = tokens[0].strip()
             c2 = tokens[1].strip()
             dist = int(tokens[2].strip())
-            route_map.add_route(c1, c2, dist)
+            routes[(c1, c2)] = dist
+            cities.setdefault(c1)
+            cities.setdefault(c2)
+
+    # Every city is known before the first route is added, so the distance
+    # matrix is allocated once. If every route is listed with the same
+    # distance both ways, only one copy of each distance is stored.
+    symmetric = all(routes.get((c2, c1)) == dist
+                    for (c1, c2), dist in routes.items())
+    route_map = DistanceMap(cities, symmetric)
+    for (c1, c2), dist in routes.items():
+        route_map.add_route(c1, c2, dist)
 
     return route_map
 
 
-def read_trucks(truck_file, depot_location):
+def convert_distance_map(distance_map_file, binary_file,
+                         shortest_paths=False):
+    """Convert the map in the .txt file <distance_map_file> to the binary map
+    format, and save it as <binary_file>
+
+    Large maps start much faster from the binary file, which read_distance_map
+    opens directly. If <shortest_paths> is True, every distance is replaced
+    with the length of the shortest path before saving, so that experiments
+    never have to compute them.
+
+    === Parameter and Return Types ===
+
+    @type distance_map_file: str
+        The name of a file containing distance data in the form specified in
+        Assignment 1.
+    @type binary_file: str
+        The name of the file to write.
+    @type shortest_paths: bool
+    @rtype: None
+    """
+    route_map = read_distance_map(distance_map_file)
+    if shortest_paths:
+        route_map.compute_shortest_paths()
+    route_map.save_binary(binary_file)
+
+
+def read_trucks(truck_file, depot_location, route_map=None):
     """Read truck data from <truck_file>
 
     Data from a .txt document is converted into truck objects. The returned
@@ -364,6 +498,8 @@ def read_trucks(truck_file, depot_location):
     @type depot_location: str
         The city where all the trucks (and packages) are at the start of the
         experiment.
+    @type route_map: DistanceMap | None
+        If given, every truck keeps track of its route distance on this map.
     @rtype: [Truck]
         Returns a list of trucks.
 
@@ -396,7 +532,7 @@ def read_trucks(truck_file, depot_location):
             tokens = line.strip().split(',')
             tid = int(tokens[0])
             capacity = int(tokens[1])
-            one_truck = Truck(tid, capacity, depot_location)
+            one_truck = Truck(tid, capacity, depot_location, route_map)
             trucks.append(one_truck)
     return trucks
 
@@ -3,10 +3,15 @@ This module reads from a json file (whose name is hard-coded in the main block)
 to determine the parcel, truck and map files to use.  It then constructs all
 nine possible algorithm configurations, and runs each on on this same data.
 Results are printed to a csv file called 'results.csv'.
+
+It can also time every registered scheduler on the same data, printing the
+results to a csv file called 'benchmark.csv'.
 """
 
 import json
+from time import perf_counter
 from experiment import SchedulingExperiment
+from scheduler import get_capabilities, list_schedulers
 
 
 def print_table_title(file):
@@ -120,7 +125,46 @@ def main(config_file):
             results = expt.run(report=False)
             print_table_row(config, results, file)
 
+
+def benchmark(config_file):
+    """Time every registered scheduler on a single problem.
+
+    Run each scheduler listed by scheduler.list_schedulers on the scheduling
+    problem defined in <config_file>, and write its capabilities, running
+    time and stats to data/benchmark.csv. Each scheduler takes the settings
+    it declares from <config_file>, and its defaults for the rest.
+
+    Precondition: <config_file> is a json file with keys and values
+    as in the dictionary format defined in Assignment 1.
+
+    @type config_file: str
+    @rtype: None
+    """
+    with open(config_file, 'r') as file:
+        basic_config = json.load(file)
+
+    with open('data/benchmark.csv', 'w') as file:
+        file.write('Algorithm,Capabilities,Seconds,Unused Trucks,' +
+                   'Unused Space,Avg dist,Avg fullness,Unsched Parcels\n')
+        for name in list_schedulers():
+            config = basic_config.copy()
+            config['algorithm'] = name
+            expt = SchedulingExperiment(config)
+            start = perf_counter()
+            results = expt.run(report=False)
+            seconds = perf_counter() - start
+            file.write('%s,%s,%.4f,%s,%s,%s,%s,%s\n' %
+                       (name,
+                        ' '.join(sorted(get_capabilities(name))),
+                        seconds,
+                        results['unused_trucks'],
+                        results['unused_space'],
+                        results['avg_distance'],
+                        results['avg_fullness'],
+                        results['unscheduled']))
+
 if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config='.pylintrc')
     main('data/demo.json')
+    benchmark('data/demo.json')
@@ -0,0 +1,290 @@
+"""route_optimizer.py
+
+=== Credit ===
+
+Allan Chang
+    1003235983
+Isaac Seah
+    1001753051
+Last edited: Oct 14, 2016
+
+=== Classes ===
+
+RouteOptimizer
+    Reorders the route of every truck after scheduling, to shorten the
+    distance travelled. Expected to be accessed by experiment.py.
+
+=== Helper Functions ===
+
+optimize_route
+    Return a short visiting order for one route, given the distances between
+    its cities.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+# Used in place of a missing route, so that orders with a missing leg always
+# cost more than orders without one, while sums stay exact.
+_MISSING = 10 ** 12
+
+
+class RouteOptimizer:
+    """Shortens the routes of scheduled trucks.
+
+    Scheduling appends cities to a route in loading order. The optimiser
+    builds a nearest-neighbour route for each truck, then improves it with
+    2-opt (reverse a stretch of the route) and Or-opt (move one to three
+    consecutive cities elsewhere) until no move helps or the time budget of
+    the truck runs out. A route is only replaced if the new order is shorter.
+    Trucks keep starting at their first city, and do not return to it.
+
+    Each truck only needs the distances between the cities on its route, so
+    trucks are optimised independently, in parallel across worker processes.
+
+    === Private Attributes ===
+
+    @type _route_map: DistanceMap
+        The map giving the distance between two cities.
+    @type _time_budget: float
+        The most time, in seconds, spent improving one truck's route.
+    @type _workers: int | None
+        The number of worker processes. 1 optimises in this process. None
+        uses one process per CPU.
+    """
+
+    def __init__(self, route_map, time_budget=1.0, workers=None):
+        """Initialise a route optimiser
+
+        === Parameter and Return Types ===
+
+        @type self: RouteOptimizer
+        @type route_map: DistanceMap
+        @type time_budget: float
+            Seconds allowed per truck.
+        @type workers: int | None
+            Number of worker processes, or None for one per CPU.
+        @rtype: None
+        """
+        self._route_map = route_map
+        self._time_budget = time_budget
+        self._workers = workers
+
+    def optimize(self, trucks):
+        """Reorder the route of every truck in <trucks>
+
+        === Parameter and Return Types ===
+
+        @type self: RouteOptimizer
+        @type trucks: [Truck]
+        @rtype: None
+
+        === Local Variables ===
+
+        type routes: [[str]]
+            The routes worth optimising, three cities or more.
+        type tasks: [[[int]]]
+            tasks[i] is the distance matrix between the cities of routes[i].
+        type orders: [[int]]
+            orders[i] is the new visiting order of routes[i], as indexes.
+
+        === Examples ===
+
+        >>> from distance_map import DistanceMap
+        >>> from domain import Truck, Parcel
+        >>> route_map = DistanceMap(symmetric=True)
+        >>> route_map.add_route("a", "b", 10)
+        >>> route_map.add_route("a", "c", 1)
+        >>> route_map.add_route("b", "c", 2)
+        >>> truck = Truck(1, 10, "a", route_map)
+        >>> truck.load_parcel(Parcel(1, "a", "b", 1))
+        >>> truck.load_parcel(Parcel(2, "a", "c", 1))
+        >>> RouteOptimizer(route_map, workers=1).optimize([truck])
+        >>> truck.get_route()
+        ['a', 'c', 'b']
+        """
+        optimised = [truck for truck in trucks if len(truck.get_route()) > 2]
+        routes = [truck.get_route() for truck in optimised]
+        tasks = [self._route_distances(route) for route in routes]
+        budgets = [self._time_budget] * len(tasks)
+        if self._workers == 1 or len(tasks) < 2:
+            orders = list(map(optimize_route, tasks, budgets))
+        else:
+            with ProcessPoolExecutor(self._workers) as executor:
+                orders = list(executor.map(optimize_route, tasks, budgets))
+
+        for truck, route, order in zip(optimised, routes, orders):
+            if order != list(range(len(route))):
+                truck.set_route([route[index] for index in order])
+
+    def _route_distances(self, route):
+        """Return the distances between the cities of <route>
+
+        === Parameter and Return Types ===
+
+        @type self: RouteOptimizer
+        @type route: [str]
+        @rtype: [[int]]
+            Entry [i][j] is the distance from route[i] to route[j].
+        """
+        city_ids = [self._route_map.city_id(city) for city in route]
+        distances = []
+        for start_id in city_ids:
+            row = []
+            for destination_id in city_ids:
+                distance = None
+                if start_id is not None and destination_id is not None:
+                    distance = self._route_map.get_id_distance(
+                        start_id, destination_id)
+                row.append(_MISSING if distance is None else distance)
+            distances.append(row)
+        return distances
+
+
+def optimize_route(distances, time_budget):
+    """Return a short order to visit every city of a route, starting at city 0
+
+    Nearest-neighbour construction followed by 2-opt and Or-opt improvement,
+    stopping after <time_budget> seconds. The result is never longer than the
+    order 0, 1, ..., n - 1.
+
+    === Parameter and Return Types ===
+
+    @type distances: [[int]]
+        distances[i][j] is the distance from city i to city j.
+    @type time_budget: float
+    @rtype: [int]
+
+    === Examples ===
+
+    >>> optimize_route([[0, 5, 1, 9], [5, 0, 1, 1], [1, 1, 0, 9],
+    ...                 [9, 1, 9, 0]], 1.0)
+    [0, 2, 1, 3]
+    """
+    deadline = perf_counter() + time_budget
+    order = _nearest_neighbour(distances)
+    identity = list(range(len(distances)))
+    if _route_cost(distances, identity) <= _route_cost(distances, order):
+        order = identity
+
+    improved = True
+    while improved and perf_counter() < deadline:
+        improved = _two_opt(distances, order, deadline) or \
+            _or_opt(distances, order, deadline)
+    return order
+
+
+def _route_cost(distances, order):
+    """Return the distance travelled visiting the cities in <order>
+
+    @type distances: [[int]]
+    @type order: [int]
+    @rtype: int
+    """
+    return sum(distances[order[index - 1]][order[index]]
+               for index in range(1, len(order)))
+
+
+def _nearest_neighbour(distances):
+    """Return the order that starts at city 0 and always visits the nearest
+    unvisited city next
+
+    @type distances: [[int]]
+    @rtype: [int]
+    """
+    unvisited = set(range(1, len(distances)))
+    order = [0]
+    while unvisited:
+        row = distances[order[-1]]
+        nearest = min(unvisited, key=lambda city: (row[city], city))
+        unvisited.remove(nearest)
+        order.append(nearest)
+    return order
+
+
+def _two_opt(distances, order, deadline):
+    """Reverse the first stretch of <order> whose reversal shortens it
+
+    order[0] stays first. The cost of a stretch in both directions comes from
+    prefix sums, so each candidate is O(1) even when distances are not
+    symmetric. Return True iff <order> was changed.
+
+    @type distances: [[int]]
+    @type order: [int]
+    @type deadline: float
+    @rtype: bool
+    """
+    size = len(order)
+    forward = [0]
+    backward = [0]
+    for index in range(1, size):
+        forward.append(forward[-1] + distances[order[index - 1]][order[index]])
+        backward.append(backward[-1] +
+                        distances[order[index]][order[index - 1]])
+
+    for first in range(1, size - 1):
+        if perf_counter() > deadline:
+            return False
+        before = order[first - 1]
+        for last in range(first + 1, size):
+            old = distances[before][order[first]] + \
+                forward[last] - forward[first]
+            new = distances[before][order[last]] + \
+                backward[last] - backward[first]
+            if last + 1 < size:
+                after = order[last + 1]
+                old += distances[order[last]][after]
+                new += distances[order[first]][after]
+            if new < old:
+                order[first:last + 1] = order[first:last + 1][::-1]
+                return True
+    return False
+
+
+def _or_opt(distances, order, deadline):
+    """Move the first stretch of one to three cities of <order> whose move
+    elsewhere shortens it
+
+    order[0] stays first, and the moved stretch keeps its direction. Return
+    True iff <order> was changed.
+
+    @type distances: [[int]]
+    @type order: [int]
+    @type deadline: float
+    @rtype: bool
+    """
+    size = len(order)
+    for length in range(1, 4):
+        for first in range(1, size - length + 1):
+            if perf_counter() > deadline:
+                return False
+            last = first + length - 1
+            head, tail = order[first], order[last]
+            before = order[first - 1]
+            saving = distances[before][head]
+            if last + 1 < size:
+                after = order[last + 1]
+                saving += distances[tail][after] - distances[before][after]
+
+            # Insert the stretch after order[gap], outside the stretch.
+            for gap in range(size):
+                if first - 1 <= gap <= last:
+                    continue
+                cost = distances[order[gap]][head]
+                if gap + 1 < size:
+                    cost += distances[tail][order[gap + 1]] - \
+                        distances[order[gap]][order[gap + 1]]
+                if cost < saving:
+                    stretch = order[first:last + 1]
+                    del order[first:last + 1]
+                    insert_at = gap + 1 if gap < first else \
+                        gap + 1 - length
+                    order[insert_at:insert_at] = stretch
+                    return True
+    return False
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+    import python_ta
+    python_ta.check_all(config='.pylintrc')